@@ -1,19 +1,29 @@
+"""
+请求校验的核心只导入必需的模块，文档页面、认证、openapi生成、mock、影子校验等在第一次使用时才导入，
+减少冷启动时的导入耗时，可以通过 `flask siwadoc importtime` 查看
+"""
+import gc
 import os
-from functools import wraps
-from typing import Optional, Type, Dict, Literal
+import threading
+from functools import partial, wraps
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Optional, Type, Dict, Literal, Union, get_args, get_origin
 
-import pydantic
-from flask import Blueprint, request, Flask, render_template
-from flask import jsonify
+from flask import Blueprint, request, Flask, Response
 from pydantic import BaseModel
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_httpauth import HTTPBasicAuth
-from . import utils, openapi, error
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.wsgi import LimitedStream
+from . import utils, error, schema, encoding
+from .cli import siwadoc_cli
+from .registry import ModelRegistry, is_model, type_adapter, validate
 from .error import ValidationError
 from pydantic import ValidationError as PydanticError
-from pydantic.errors import PydanticUserError
-from pydantic.v1.error_wrappers import ErrorWrapper
-import uuid
+
+if TYPE_CHECKING:
+    from .cache import CacheBackend, CachePolicy
+    from .shadow import ShadowValidator
+    from .sampler import TrafficSampler
+    from .failures import FailureLogger
 
 __all__ = ["SiwaDoc", "ValidationError"]
 
@@ -21,28 +31,96 @@ __version__ = "0.2.4"
 
 SUPPORTED_UI = ('redoc', 'swagger', 'rapidoc')
 
-auth = HTTPBasicAuth()
-users = dict()
-
 
-@auth.verify_password
-def verify_password(username, password):
-    if username in users and \
-            check_password_hash(users.get(username), password):
-        return username
+def __getattr__(name):
+    # 文档页面的认证移到了 ui 模块，第一次访问时才创建
+    if name in ("auth", "users"):
+        from . import ui
+        return ui.get_auth() if name == "auth" else ui.users
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def fingerprinted_url(url: str, fingerprint: str) -> str:
+    """
+    /openapi.json -> /openapi.<fingerprint>.json
+    """
+    base, ext = os.path.splitext(url)
+    return f"{base}.{fingerprint}{ext or '.json'}"
+
+
+def _limit_body(max_bytes: int):
+    """
+    限制当前请求体的大小，读取请求体(json、form)时超过限制抛出 RequestEntityTooLarge
+    chunked请求没有Content-Length，werkzeug读到上限就截断，多读一个字节才能判断是否超过
+    """
+    limit = max_bytes + (request.content_length is None)
+    try:
+        request.max_content_length = limit
+    except AttributeError:
+        # Flask 3.1 之前 max_content_length 是只读的，直接限制请求体的流
+        if request.content_length is not None:
+            if request.content_length > max_bytes:
+                raise RequestEntityTooLarge()
+        else:
+            request.stream = LimitedStream(request.stream, limit, is_max=True)
+
+
+def _read_file(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_file(path: str, data: bytes) -> None:
+    """
+    先写临时文件再重命名，多个worker同时写入时不会读到不完整的文件；目录不可写时忽略
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
 
 
 class SiwaDoc:
     def __init__(self,
-                 app: Flask = None,
+                 app: Union[Flask, Blueprint] = None,
                  title: str = "SiwaDocAPI",
                  description: str = "",
                  version="latest",
                  doc_url: Optional[str] = "/docs",
                  openapi_url: Optional[str] = "/openapi.json",
-                 ui: Literal["redoc", "swagger", "rapidoc"] = "swagger"):
-        self.app = app
+                 ui: Literal["redoc", "swagger", "rapidoc"] = "swagger",
+                 mock: bool = False,
+                 mock_seed: int = 0,
+                 json_provider: bool = False,
+                 cache_backend: Optional["CacheBackend"] = None,
+                 shadow: Optional["ShadowValidator"] = None,
+                 sampler: Optional["TrafficSampler"] = None,
+                 spec_cache_dir: Optional[str] = None,
+                 batch_url: Optional[str] = None,
+                 batch_workers: int = 0,
+                 batch_max_calls: int = 50,
+                 files_workers: int = 4,
+                 failure_log: Optional["FailureLogger"] = None):
+        self.app = None
+        # 绑定到蓝图时，文档只包含该蓝图的路由
+        self.blueprint: Optional[Blueprint] = None
+        self.blueprint_name: Optional[str] = None
         self._openapi = None
+        self._openapi_json: Optional[bytes] = None
+        # (endpoint, method) -> openapi.Operation，和文档一起生成
+        self._operation_index: Optional[Dict] = None
+        # 保证并发请求时文档只生成一次
+        self._lock = threading.RLock()
         self.title = title
         self.description = description
         self.version = version
@@ -50,77 +128,315 @@ class SiwaDoc:
         self.openapi_url = openapi_url
         self.openapi_version = "3.0.2"
         self.ui = ui
-        self.models: Dict[str, Dict] = {}
+        self.models = ModelRegistry()
+        # mock模式下接口不再调用视图函数，直接返回根据resp模型生成的数据
+        self.mock = mock
+        self.mock_seed = mock_seed
+        self._mock_bodies: Dict[str, bytes] = {}
+        # 使用 encoding.SiwaJSONProvider 编码响应
+        self.json_provider = json_provider
+        # doc(cache=...) 默认使用的缓存后端，没有指定时第一次使用才创建进程内缓存
+        self._cache_backend = cache_backend
+        # doc(mode="shadow") 的接口在后台线程中校验，第一次使用时创建
+        self._shadow = shadow
+        # 采样校验通过的请求和响应，作为文档中的examples
+        self.sampler = sampler
+        self._examples_json: Optional[tuple] = None
+        # 编码后的文档按指纹缓存到该目录，重启后指纹不变时不再生成文档，也可以通过 SIWA_SPEC_CACHE_DIR 配置
+        self.spec_cache_dir = spec_cache_dir
+        self._fingerprint: Optional[str] = None
+        # 批量请求的地址，设置后注册到文档蓝图；batch_workers 大于1时用线程池并发执行子请求
+        self.batch_url = batch_url
+        self.batch_workers = batch_workers
+        self.batch_max_calls = batch_max_calls
+        self._batch_executor = None
+        # files 中声明了 checksum、sniff_type、checks 时，多个上传文件在该线程池中并发检查
+        self.files_workers = files_workers
+        self._files_executor = None
+        # 校验失败时异步记录结构化日志
+        self.failure_log = failure_log
         if app is not None:
             self.init_app(app)
 
-    def init_app(self, app: Flask):
+    def init_app(self, app: Union[Flask, Blueprint]):
+        """
+        :param app: Flask应用或者蓝图，传入蓝图时在蓝图注册到应用后初始化，
+                    文档地址位于蓝图的url_prefix下，例如 /v1/docs
+        """
+        if isinstance(app, Blueprint):
+            self.blueprint = app
+            app.record_once(lambda state: self._setup(state.app,
+                                                      f"{state.name_prefix}.{state.name}".lstrip("."),
+                                                      state.url_prefix))
+            return
+        self._setup(app)
+
+    def _setup(self, app: Flask, blueprint_name: Optional[str] = None, url_prefix: Optional[str] = None):
         self.app = app
-        self._register_doc_blueprint()
-
-    def _register_doc_blueprint(self):
-        """
-        注册文档蓝图
-        """
-        template_folder = os.path.join(os.path.dirname(__file__), "templates")
-        siwa_bp = Blueprint("siwadoc",
-                            __name__,
-                            template_folder=template_folder,
-                            )
-
-        @siwa_bp.route(self.doc_url)
-        def doc_html():
-            siwa_user = self.app.config.get("SIWA_USER")
-            siwa_pass = self.app.config.get("SIWA_PASSWORD")
-            if siwa_user and siwa_pass:
-                global users
-                users = {
-                    siwa_user: generate_password_hash(siwa_pass),
-                }
-                login_info = auth.get_auth()
-                password = auth.get_auth_password(login_info)
-                status = None
-                user = auth.authenticate(login_info, password)
-                if user in (False, None):
-                    status = 401
-                elif not auth.authorize(None, user, auth):
-                    status = 403
-                if status:
-                    try:
-                        return auth.auth_error_callback(status)
-                    except TypeError:
-                        return auth.auth_error_callback()
-            ui = request.args.get("ui") or self.ui
-            assert ui in SUPPORTED_UI, f"ui only support with {SUPPORTED_UI}"
-            ui_file = f'{ui}.html'
-            return render_template(ui_file, spec_url=self.openapi_url)
-
-        @siwa_bp.route(f'{self.openapi_url}')
-        def doc_json():
-            return jsonify(self.openapi)
-
-        self.app.register_blueprint(siwa_bp)
+        self.blueprint_name = blueprint_name
+        # 命令行工具使用应用级别的实例，只有蓝图实例时使用第一个注册的
+        if blueprint_name is None or "siwadoc" not in app.extensions:
+            app.extensions["siwadoc"] = self
+        app.cli.add_command(siwadoc_cli)
+        if self.json_provider:
+            app.json = encoding.SiwaJSONProvider(app)
+        for name, converter in app.url_map.converters.items():
+            schema.infer_converter(name, converter)
+        if self.doc_url or self.openapi_url or self.batch_url:
+            from .ui import register_doc_blueprint
+            register_doc_blueprint(self, url_prefix)
+
+    def operations(self):
+        """
+        遍历当前实例的接口，绑定到蓝图时只扫描蓝图的路由
+        :return: (rule, method, func)
+        """
+        from .openapi import iter_operations
+        return iter_operations(self.app, blueprint=self.blueprint_name, owner=self)
+
+    def _executor(self, attr: str, workers: int, thread_name_prefix: str):
+        """
+        第一次使用时创建的共享线程池，workers 不大于1时为None
+        :param attr: 保存线程池的属性名
+        """
+        if getattr(self, attr) is None and workers > 1:
+            with self._lock:
+                if getattr(self, attr) is None:
+                    from concurrent.futures import ThreadPoolExecutor
+                    setattr(self, attr, ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix))
+        return getattr(self, attr)
+
+    @property
+    def batch_executor(self):
+        """
+        批量请求共享的线程池，batch_workers 不大于1时为None，子请求依次执行
+        """
+        return self._executor("_batch_executor", self.batch_workers, "siwadoc-batch")
+
+    @property
+    def files_executor(self):
+        """
+        上传文件检查共享的线程池，files_workers 不大于1时为None，文件依次检查
+        """
+        return self._executor("_files_executor", self.files_workers, "siwadoc-files")
+
+    @property
+    def cache_backend(self) -> "CacheBackend":
+        if self._cache_backend is None:
+            with self._lock:
+                if self._cache_backend is None:
+                    from .cache import MemoryCache
+                    self._cache_backend = MemoryCache()
+        return self._cache_backend
+
+    @cache_backend.setter
+    def cache_backend(self, backend: "CacheBackend"):
+        self._cache_backend = backend
+
+    @property
+    def shadow(self) -> "ShadowValidator":
+        if self._shadow is None:
+            with self._lock:
+                if self._shadow is None:
+                    from .shadow import ShadowValidator
+                    self._shadow = ShadowValidator()
+        return self._shadow
+
+    def register_converter(self, converter: str, factory):
+        """
+        注册自定义路由转换器对应的schema
+        :param converter: 转换器名称，与 app.url_map.converters 中的key一致
+        :param factory: 接收转换器参数，返回 schema.BaseSchema 实例或者 schema dict
+        """
+        schema.register_converter(converter, factory)
+        with self._lock:
+            self._openapi = None
+            self._openapi_json = None
+            self._operation_index = None
+            self._examples_json = None
+            self._fingerprint = None
 
     @property
     def openapi(self):
         if not self._openapi:
-            self._openapi = openapi.generate_openapi(openapi_version=self.openapi_version,
-                                                     title=self.title,
-                                                     version=self.version,
-                                                     description=self.description,
-                                                     app=self.app,
-                                                     models=self.models)
+            with self._lock:
+                if not self._openapi:
+                    from .openapi import generate_openapi
+                    index = {}
+                    spec = generate_openapi(openapi_version=self.openapi_version,
+                                            title=self.title,
+                                            version=self.version,
+                                            description=self.description,
+                                            app=self.app,
+                                            models=self.models,
+                                            operations=self.operations(),
+                                            response_media_types=encoding.response_media_types(self.app),
+                                            index=index)
+                    self._operation_index = index
+                    self._openapi = spec
         return self._openapi
 
+    @property
+    def operation_index(self) -> Dict:
+        """
+        (endpoint, method) 到 openapi.Operation 的索引，和文档一起生成
+        文档从磁盘缓存加载时单独建立索引
+        """
+        if self._operation_index is None:
+            with self._lock:
+                if self._operation_index is None:
+                    from .openapi import build_index
+                    self._operation_index = build_index(self.operations())
+        return self._operation_index
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        文档的指纹，由路由、装饰器参数、模型的schema和文档选项计算，不需要生成文档
+        """
+        if self._fingerprint is None:
+            with self._lock:
+                if self._fingerprint is None:
+                    from .openapi import fingerprint
+                    json_provider = type(self.app.json)
+                    self._fingerprint = fingerprint(self.operations(),
+                                                    self.models,
+                                                    title=self.title,
+                                                    version=self.version,
+                                                    description=self.description,
+                                                    openapi_version=self.openapi_version,
+                                                    response_media_types=encoding.response_media_types(self.app),
+                                                    json_provider=f"{json_provider.__module__}.{json_provider.__qualname__}",
+                                                    siwadoc_version=__version__)
+        return self._fingerprint
+
+    @property
+    def fingerprinted_openapi_url(self) -> Optional[str]:
+        """
+        带指纹的文档地址，例如 /openapi.3f2a9c0d1e5b7a64.json，内容不变时地址不变，可以永久缓存
+        """
+        if not self.openapi_url:
+            return None
+        return fingerprinted_url(self.openapi_url, self.fingerprint)
+
+    @staticmethod
+    def _operation_key():
+        if request.url_rule is None:
+            return None
+        return request.url_rule.endpoint, "GET" if request.method == "HEAD" else request.method
+
+    def current_operation(self):
+        """
+        当前请求对应的 openapi.Operation，没有被siwadoc装饰的接口返回None
+        可以在 before_request 中使用，例如按 operation_id 统计指标
+        """
+        key = self._operation_key()
+        return None if key is None else self.operation_index.get(key)
+
+    def _log_failure(self, location: str, error: PydanticError):
+        operation = self.current_operation()
+        if location == "query":
+            data = request.query_string
+        elif location == "path":
+            data = request.view_args
+        elif location == "body":
+            data = request.get_data(cache=True)
+        elif location == "form":
+            data = request.form.to_dict(flat=False)
+        elif location == "files":
+            data = {k: [f.filename for f in v] for k, v in request.files.lists()}
+        else:
+            data = None
+        self.failure_log.record(operation.operation_id if operation else request.endpoint, location, error, data)
+
+    def examples_openapi_json(self) -> bytes:
+        """
+        合并了采样数据的文档，只在有新样本时重新生成
+        """
+        version = self.sampler.version
+        cached = self._examples_json
+        if cached is None or cached[0] != version:
+            spec = self.sampler.merge(self.openapi, self.operation_index)
+            cached = self._examples_json = (version, self.app.json.dumps(spec).encode())
+        return cached[1]
+
+    @property
+    def openapi_json(self) -> bytes:
+        """
+        编码后的文档，只编码一次
+        """
+        if self._openapi_json is None:
+            with self._lock:
+                if self._openapi_json is None:
+                    cache_dir = self.spec_cache_dir or self.app.config.get("SIWA_SPEC_CACHE_DIR")
+                    data = None
+                    if cache_dir:
+                        cache_file = os.path.join(cache_dir, f"openapi.{self.fingerprint}.json")
+                        data = _read_file(cache_file)
+                    if data is None:
+                        data = self.app.json.dumps(self.openapi).encode()
+                        if cache_dir:
+                            _write_file(cache_file, data)
+                    self._openapi_json = data
+        return self._openapi_json
+
+    def warmup(self, freeze_gc: bool = False):
+        """
+        提前生成并编码文档、构建所有模型的校验器，避免首个请求的延迟
+        在gunicorn --preload 等fork之前的阶段调用时，这些数据由所有worker以copy-on-write的方式共享
+        :param freeze_gc: 调用 gc.freeze()，避免worker中的垃圾回收修改这些对象所在的内存页
+        """
+        with self._lock:
+            for model in self.models.models():
+                if model is BaseModel:
+                    continue
+                if not is_model(model):
+                    # List[Item]、dataclass 等类型的校验器在 TypeAdapter 中
+                    type_adapter(model)
+                elif not model.__pydantic_complete__:
+                    model.model_rebuild(force=True)
+            self.openapi_json
+            if self.mock_enabled:
+                for _, _, func in self.operations():
+                    self.mock_response(func)
+        if freeze_gc:
+            gc.collect()
+            gc.freeze()
+
+    @property
+    def mock_enabled(self) -> bool:
+        return bool(self.mock or self.app.config.get("SIWA_MOCK"))
+
+    def mock_response(self, func) -> Response:
+        """
+        返回接口的模拟响应，响应体按接口缓存，同一个seed每次生成的数据相同
+        :param func: 被siwadoc装饰的视图函数
+        """
+        key = f"{func.__module__}.{func.__qualname__}"
+        body = self._mock_bodies.get(key)
+        if body is None:
+            resp_name = getattr(func, "resp", None)
+            from .mock import generate_body
+            body = generate_body(self.models.model(resp_name), key, self.mock_seed,
+                                      many=getattr(func, "resp_many", False)) if resp_name else b""
+            self._mock_bodies[key] = body
+        return Response(body, mimetype="application/json" if body else None)
+
     def doc(self,
             query: Optional[Type[BaseModel]] = None,
             param: Optional[Type[BaseModel]] = None,
+            path: Optional[Type[BaseModel]] = None,
             header: Optional[Type[BaseModel]] = None,
             cookie: Optional[Type[BaseModel]] = None,
             body: Optional[Type[BaseModel]] = None,
             form: Optional[Type[BaseModel]] = None,
             files=None,
             resp=None,
+            max_body_bytes: Optional[int] = None,
+            max_json_depth: Optional[int] = None,
+            max_items: Optional[int] = None,
+            cache: Union[int, float, "CachePolicy", None] = None,
+            mode: Literal["strict", "shadow"] = "strict",
             x=[],
             tags=[],
             group=None,
@@ -129,57 +445,165 @@ class SiwaDoc:
             ):
         """
         装饰器同时兼具文档生成和请求数据校验功能
+        :param max_body_bytes: 请求体的最大字节数，读取请求体时超过则返回413
+        :param max_json_depth: json请求体的最大嵌套深度，解析之前检查，超过则返回400
+        :param max_items: json请求体中单个数组或对象的最大元素个数，解析之前检查，超过则返回400
+        :param cache: GET请求的响应缓存时间(秒)或者 cache.CachePolicy，按路径参数和校验后的query缓存，
+                      resp=List[Model] 的视图返回生成器时先全部取出再缓存，响应为json数组，不再流式输出
+        :param files: 文件参数配置 {字段名: {"required", "single", "checksum", "sniff_type", "checks"}}，
+                      检查的结果保存在文件的 checks 属性，见 uploads 模块
+        :param mode: strict 校验失败时拒绝请求；shadow 不校验也不注入参数，直接调用视图函数，
+                     请求数据交给 SiwaDoc.shadow 在后台校验，只记录日志和计数，用于上线严格校验之前评估影响
         """
+        assert mode in ("strict", "shadow"), "mode only support strict or shadow"
+        if mode == "shadow":
+            from .shadow import validate_request
         if not query:
             query = param
-        # 当formdata中有文件时，将文件参数添加到form schema中。需要将form动态创建一个子类，保证schema不冲突。
-        if files and form:
-            form = type(f'{form.__name__}-{uuid.uuid1()}', (form,), {})
+        process_files = None
+        if files:
+            from . import uploads
+            uploads.check_files_conf(files)
+            if any(map(uploads.has_checks, files.values())):
+                process_files = uploads.process_files
+        cache_policy = None
+        if cache is not None:
+            from .cache import CachePolicy, cache_key, cached_response
+            cache_policy = CachePolicy(ttl=cache) if isinstance(cache, (int, float)) else cache
+        # resp=List[Model] 时文档中的响应为数组，视图函数可以返回生成器流式输出
+        # Optional[List[Item]]、Set、Tuple 等作为整体类型注册，不流式输出
+        resp_many = get_origin(resp) is list and len(get_args(resp)) == 1
+        if resp_many:
+            resp = get_args(resp)[0]
 
         def decorate_validate(func):
+            # 已经检查过path模型的路由
+            checked_rules = set()
+
+            def render(args, kwargs):
+                rv = func(*args, **kwargs)
+                if resp_many and isinstance(rv, Iterator):
+                    # 缓存的响应需要完整的响应体，生成器先转换成列表，不再流式输出
+                    rv = list(rv)
+                return encoding.make_response(rv)
+
+            def call_view(args, kwargs, query_data):
+                if cache_policy is not None and request.method == "GET":
+                    return cached_response(cache_policy,
+                                           cache_policy.backend or self.cache_backend,
+                                           cache_key(query_data),
+                                           lambda: render(args, kwargs))
+
+                rv = func(*args, **kwargs)
+                if resp_many and isinstance(rv, Iterator):
+                    return encoding.stream_response(rv)
+                return encoding.make_response(rv)
+
             @wraps(func)
             def wrapper(*args, **kwargs):
-                query_data, body_data, form_data, files_data = None, None, None, None
+                query_data, path_data, body_data, form_data, files_data = None, None, None, None, None
                 # 注解参数
                 query_in_kwargs = func.__annotations__.get("query") or func.__annotations__.get("param")
+                path_in_kwargs = func.__annotations__.get("path")
+                rule = request.url_rule
+                if not is_model(path_in_kwargs) or (rule is not None and "path" in rule.arguments):
+                    # <path:path> 等名为path的路由变量，不是path模型
+                    path_in_kwargs = None
                 body_in_kwargs = func.__annotations__.get("body")
                 form_in_kwargs = func.__annotations__.get("form")
                 files_in_kwargs = func.__annotations__.get("files")
                 query_model = query_in_kwargs or query
+                path_model = path_in_kwargs or path
                 body_model = body_in_kwargs or body
                 form_model = form_in_kwargs or form
 
-                if query_model:
-                    query_params = utils.convert_query_params(request.args, query_model)
-                    query_data = query_model(**query_params)
-
-                if body_model is not None:
-                    body_data = body_model(**(request.get_json(force=True, silent=True) or {}))
-
-                if form_model:
-                    form_data = form_model(**request.form)
-
-                    if files:
-                        request_files = request.files
-                        files_data = {}
-                        for file_field, file_conf in files.items():
-                            is_required_ = file_conf.get('required', False)
-                            is_single_file_ = file_conf.get('single', True)
-                            file_list = request_files.getlist(file_field)
-                            if is_required_ and not file_list:
-                                raise PydanticError(errors=[ErrorWrapper(exc=PydanticUserError(), loc=(file_field,))],
-                                                    model=form_model)
-
-                            if file_list and is_single_file_ and len(file_list) > 1:
-                                raise PydanticError(
-                                    errors=[ErrorWrapper(exc=PydanticUserError(limit_value=1), loc=(file_field,))],
-                                    model=form_model)
-
-                            if file_list:
-                                files_data[file_field] = file_list[0] if is_single_file_ else file_list
+                if mode == "shadow":
+                    # 只读取原始数据，解析和校验都在后台线程中进行
+                    task = partial(validate_request, query_model, path_model, body_model, form_model,
+                                   args=request.args,
+                                   view_args=dict(request.view_args or {}),
+                                   body=request.get_data(cache=True) if body_model is not None else None,
+                                   form=request.form.copy() if form_model else None)
+                    self.shadow.submit(request.endpoint, task)
+                    if self.mock_enabled:
+                        return self.mock_response(wrapper)
+                    return call_view(args, kwargs, None)
+
+                if max_body_bytes is not None:
+                    _limit_body(max_body_bytes)
+
+                location = None
+                try:
+                    if query_model:
+                        location = "query"
+                        query_params = utils.convert_query_params(request.args, query_model)
+                        query_data = validate(query_model, query_params)
+
+                    if path_model:
+                        location = "path"
+                        if rule is not None and rule.rule not in checked_rules:
+                            utils.check_path_model(rule.arguments, path_model)
+                            checked_rules.add(rule.rule)
+                        # 路由转换器已完成类型转换，这里再用模型做约束校验（正则、范围、枚举等）
+                        path_data = path_model.model_validate(request.view_args or {})
+
+                    if body_model is not None:
+                        location = "body"
+                        if max_body_bytes is not None or max_json_depth is not None or max_items is not None:
+                            raw_body = request.get_data(cache=True)
+                            if max_body_bytes is not None and len(raw_body) > max_body_bytes:
+                                raise RequestEntityTooLarge()
+                            if max_json_depth is not None or max_items is not None:
+                                utils.check_json_limits(raw_body, max_json_depth, max_items)
+                        json_data = request.get_json(force=True, silent=True)
+                        if json_data is None and is_model(body_model):
+                            json_data = {}
+                        # pydantic模型之外的类型(List[Item]、dataclass等)通过缓存的 TypeAdapter 校验
+                        body_data = validate(body_model, json_data)
+
+                    if form_model:
+                        location = "form"
+                        # form=BaseModel 表示form中只有文件，BaseModel本身不能实例化
+                        if form_model is not BaseModel:
+                            form_data = form_model(**utils.convert_form_params(request.form, form_model))
+
+                        if files:
+                            location = "files"
+                            request_files = request.files
+                            files_data = {}
+                            file_errors = []
+                            for file_field, file_conf in files.items():
+                                is_required_ = file_conf.get('required', False)
+                                is_single_file_ = file_conf.get('single', True)
+                                file_list = request_files.getlist(file_field)
+                                if is_required_ and not file_list:
+                                    file_errors.append({"type": "missing", "loc": (file_field,), "input": None})
+                                elif file_list and is_single_file_ and len(file_list) > 1:
+                                    file_errors.append({"type": "too_long",
+                                                        "loc": (file_field,),
+                                                        "input": [f.filename for f in file_list],
+                                                        "ctx": {"field_type": "List",
+                                                                "max_length": 1,
+                                                                "actual_length": len(file_list)}})
+                                elif file_list:
+                                    files_data[file_field] = file_list[0] if is_single_file_ else file_list
+                            if file_errors:
+                                raise PydanticError.from_exception_data("files", file_errors)
+                            if process_files is not None:
+                                process_files(files_data, files, self.files_executor)
+                except PydanticError as e:
+                    # 记录校验失败，异常继续交给应用的错误处理
+                    if self.failure_log is not None:
+                        self._log_failure(location, e)
+                    raise
+
+                if self.mock_enabled:
+                    return self.mock_response(wrapper)
 
                 if query_in_kwargs:
                     kwargs["query"] = query_data
+                if path_in_kwargs:
+                    kwargs["path"] = path_data
                 if body_in_kwargs:
                     kwargs["body"] = body_data
                 if form_in_kwargs:
@@ -187,40 +611,53 @@ class SiwaDoc:
                 if files_in_kwargs:
                     kwargs["files"] = files_data
 
-                return func(*args, **kwargs)
+                if self.sampler is not None:
+                    key = self._operation_key()
+                    if key is not None and self.sampler.should_sample(key):
+                        from .sampler import sample_response
+                        response = self.app.make_response(call_view(args, kwargs, query_data))
+                        self.sampler.record(key,
+                                            query=query_data,
+                                            body=body_data if body_data is not None else form_data,
+                                            response=sample_response(response))
+                        return response
+
+                return call_view(args, kwargs, query_data)
 
             for model, name in zip(
-                    (query, header, cookie, body, form, resp), ('query', 'header', 'cookie', 'body', 'form', 'resp')
+                    (query, path, header, cookie, body, form, resp),
+                    ('query', 'path', 'header', 'cookie', 'body', 'form', 'resp')
             ):
                 if model:
-                    assert issubclass(model, BaseModel)
-                    schema = model.schema()
-
-                    if name == 'form' and files:
-                        # 将files中定义的字段填充到form的schema中
+                    # query、body、resp 可以是任意 TypeAdapter 支持的类型，其它位置需要字段，只能是模型
+                    if name not in ('query', 'body', 'resp'):
+                        assert is_model(model)
+                    # 当formdata中有文件时，将文件参数添加到form的schema中，作为单独的组件注册
+                    model_files = files if name == 'form' else None
+                    if model_files:
                         assert isinstance(files, dict)
-                        for field, conf in files.items():
-                            is_single_file = conf.get('single', True)
-                            if is_single_file:
-                                file_schema = {'title': field, 'type': 'string', 'format': 'binary'}
-                            else:
-                                file_schema = {'title': field, 'type': 'array',
-                                               'items': {'type': 'string', 'format': 'binary'}}
-                            schema['properties'][field] = file_schema
-
-                            is_required = conf.get('required', False)
-                            if is_required:
-                                required_fields = schema.get('required', [])
-                                required_fields.append(field)
-                                schema['required'] = required_fields
-
-                    self.models[model.__name__] = schema
-                    setattr(wrapper, name, model.__name__)
+                    component = self.models.register(model, files=model_files)
+                    if name == 'query':
+                        query_schema = self.models[component]
+                        assert "properties" in query_schema or query_schema.get("type") == "object", \
+                            f"query type {model!r} must be an object with fields or a mapping"
+                    setattr(wrapper, name, component)
 
             code_msg = {}
             if code_msg:
                 wrapper.x = code_msg
 
+            if files:
+                wrapper.files = files
+            if resp_many:
+                wrapper.resp_many = True
+            if cache_policy is not None:
+                wrapper.cache = cache_policy.describe()
+            limits = {'maxBodyBytes': max_body_bytes, 'maxJsonDepth': max_json_depth, 'maxItems': max_items}
+            if any(v is not None for v in limits.values()):
+                wrapper.limits = {k: v for k, v in limits.items() if v is not None}
+            if mode == "shadow":
+                wrapper.mode = mode
             if tags:
                 wrapper.tags = tags
             if group:
@@ -228,6 +665,7 @@ class SiwaDoc:
             wrapper.summary = summary
             wrapper.description = description
             wrapper._decorated = True  # 标记判断改函数是否加入openapi
+            wrapper._siwadoc = self  # 多个实例时只加入装饰它的实例的文档
             return wrapper
 
         return decorate_validate
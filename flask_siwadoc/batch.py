@@ -0,0 +1,111 @@
+"""
+批量请求
+
+一个请求中包含多个子请求 [{"method", "path", "query", "body", "headers"}]，
+每个子请求在当前进程内按普通请求分发(before_request、校验、错误处理等都会执行)，结果按顺序返回
+只能调用被siwadoc装饰的接口，子请求默认继承批量请求的请求头(认证信息、cookie等)
+"""
+import sys
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Mapping, Optional
+from urllib.parse import urlencode
+
+import pydantic_core
+from flask import Flask, request
+from pydantic import ValidationError as PydanticError
+from werkzeug.exceptions import BadRequest, HTTPException
+from werkzeug.test import EnvironBuilder
+
+__all__ = ["dispatch_batch"]
+
+# 不传递给子请求的请求头，由子请求自身的body决定
+_SKIP_HEADERS = frozenset(("content-length", "content-type", "transfer-encoding"))
+
+
+def _result(status: int, body: Any, headers: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+    result = {"status": status, "body": body}
+    if headers:
+        result["headers"] = dict(headers)
+    return result
+
+
+def _dispatch(siwa, base_url: str, host: str, base_headers: Mapping[str, str], call: Any) -> Dict[str, Any]:
+    app: Flask = siwa.app
+    if not isinstance(call, dict):
+        return _result(400, {"message": "sub-request must be an object"})
+    method = call.get("method", "GET")
+    if not isinstance(method, str) or not method.isalpha():
+        return _result(400, {"message": "method must be an HTTP method name"})
+    method = method.upper()
+    path = call.get("path")
+    if not isinstance(path, str) or not path.startswith("/"):
+        return _result(400, {"message": "path must be an absolute path"})
+    path, _, query_string = path.partition("?")
+    query = call.get("query")
+    if isinstance(query, dict):
+        query_string = urlencode(query, doseq=True)
+    elif isinstance(query, str):
+        query_string = query
+
+    # 只分发文档中的接口
+    adapter = app.url_map.bind(host)
+    try:
+        rule, _ = adapter.match(path, method, return_rule=True)
+    except HTTPException as e:
+        return _result(e.code, {"message": e.description})
+    operation = siwa.operation_index.get((rule.endpoint, "GET" if method == "HEAD" else method))
+    if operation is None:
+        return _result(404, {"message": "operation is not documented"})
+
+    headers = call.get("headers") or {}
+    if not isinstance(headers, dict) or not all(isinstance(v, str) for v in headers.values()):
+        return _result(400, {"message": "headers must be an object of strings"})
+    headers = {**base_headers, **headers}
+    builder = EnvironBuilder(path=path,
+                             base_url=base_url,
+                             method=method,
+                             query_string=query_string,
+                             headers=headers,
+                             json=call["body"] if call.get("body") is not None else None)
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    # 每个子请求使用独立的应用上下文(g、teardown_appcontext)，依次执行时不共用批量请求的上下文
+    with app.app_context(), app.request_context(environ):
+        try:
+            response = app.full_dispatch_request()
+        except PydanticError as e:
+            errors = e.errors(include_url=False, include_context=False)
+            return _result(400, {"errors": pydantic_core.to_jsonable_python(errors, fallback=str)})
+        except Exception:
+            app.log_exception(sys.exc_info())
+            return _result(500, {"message": "Internal Server Error"})
+        if response.is_json:
+            body = response.get_json(silent=True)
+        else:
+            body = response.get_data(as_text=True)
+        location = response.headers.get("Location")
+        return _result(response.status_code, body, {"Location": location} if location else None)
+
+
+def dispatch_batch(siwa, calls: Any, executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
+    """
+    分发当前批量请求中的子请求，需要在批量请求的上下文中调用
+    :param siwa: SiwaDoc实例
+    :param calls: 子请求列表
+    :param executor: 传入线程池时并发执行子请求，否则依次执行
+    :return: [{"status", "body", "headers"}]，与子请求的顺序一致
+    """
+    if not isinstance(calls, list):
+        raise BadRequest("batch request body must be an array")
+    if len(calls) > siwa.batch_max_calls:
+        raise BadRequest(f"batch request exceeds the maximum of {siwa.batch_max_calls} sub-requests")
+    # 子请求可能在其它线程中执行，提前取出批量请求的信息
+    host = request.host
+    base_url = f"{request.scheme}://{host}{request.script_root}"
+    base_headers = {k: v for k, v in request.headers.items() if k.lower() not in _SKIP_HEADERS}
+    if executor is None or len(calls) < 2:
+        return [_dispatch(siwa, base_url, host, base_headers, call) for call in calls]
+    return list(executor.map(lambda call: _dispatch(siwa, base_url, host, base_headers, call), calls))
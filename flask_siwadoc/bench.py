@@ -0,0 +1,251 @@
+"""
+根据openapi文档生成请求并压测所有被siwadoc装饰的接口
+
+请求由 query、body、form 等模型的schema生成，可以额外生成一份校验不通过的请求，
+统计每个接口、每种校验结果的RPS和延迟分位数
+"""
+import json
+import multiprocessing
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+from . import registry, utils
+from .client import ConnectionPool, _encode_multipart
+from .mock import generate_example
+
+Sender = Callable[["Case"], int]
+
+
+@dataclass
+class Case:
+    operation: str
+    method: str
+    url: str
+    kind: str = "valid"
+    body: Optional[bytes] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def _invalidate(schema: Mapping[str, Any], data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    把合法数据改成校验不通过的数据：去掉一个必填字段，或者给数值字段传字符串
+    """
+    for name in schema.get("required", []):
+        if name in data:
+            return {k: v for k, v in data.items() if k != name}
+    for name, sub in schema.get("properties", {}).items():
+        if sub.get("type") in ("integer", "number", "boolean"):
+            return {**data, name: "invalid"}
+    return None
+
+
+def build_cases(siwa, invalid: bool = False, seed: int = 0) -> List[Case]:
+    """
+    为每个接口生成一个合法请求，invalid为True时再生成一个校验不通过的请求
+    :param siwa: SiwaDoc实例
+    :param invalid: 是否生成校验不通过的请求
+    :param seed: 随机种子
+    """
+    spec = siwa.openapi
+    cases = []
+    for rule, method, func in siwa.operations():
+        path, _ = utils.parse_route(str(rule))
+        operation = spec["paths"][path][method.lower()]
+        rng = random.Random(zlib.crc32(f"{path}:{method}".encode()) ^ seed)
+
+        def example(location):
+            name = getattr(func, location, None)
+            if not name:
+                return None, None
+            model_schema, definitions = registry.model_schema(siwa.models.model(name))
+            return model_schema, generate_example(model_schema, rng, definitions)
+
+        url = path
+        for param in operation["parameters"]:
+            if param["in"] == "path":
+                url = url.replace(f'{{{param["name"]}}}', quote(str(generate_example(param["schema"], rng)), safe=""))
+
+        parts = {location: example(location) for location in ("query", "header", "cookie", "body", "form")}
+        variants = [("valid", {location: data for location, (_, data) in parts.items()})]
+        if invalid:
+            for location in ("body", "form", "query"):
+                model_schema, data = parts[location]
+                broken = _invalidate(model_schema, data) if model_schema else None
+                if broken is not None:
+                    variants.append(("invalid", {**variants[0][1], location: broken}))
+                    break
+
+        for kind, data in variants:
+            case = Case(operation=f"{method} {path}", method=method, url=url, kind=kind)
+            if data["query"]:
+                case.url = f"{url}?{urlencode(data['query'], doseq=True)}"
+            if data["header"]:
+                case.headers.update({k: str(v) for k, v in data["header"].items()})
+            if data["cookie"]:
+                case.headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in data["cookie"].items())
+            if data["body"] is not None:
+                case.body = json.dumps(data["body"]).encode()
+                case.headers["Content-Type"] = "application/json"
+            elif data["form"] is not None:
+                files = {name: (f"{name}.bin", b"siwadoc") for name in (getattr(func, "files", None) or {})}
+                case.body, case.headers["Content-Type"] = _encode_multipart(data["form"], files)
+            cases.append(case)
+    return cases
+
+
+def app_sender(app) -> Sender:
+    """
+    通过flask test client发送请求，不经过网络，每个线程一个client
+    """
+    local = threading.local()
+
+    def send(case: Case) -> int:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        return client.open(case.url, method=case.method, data=case.body, headers=case.headers).status_code
+
+    return send
+
+
+def server_sender(base_url: str, pool_size: int) -> Sender:
+    """
+    向运行中的服务发送请求，连接复用
+    """
+    pool = ConnectionPool(base_url, maxsize=pool_size)
+
+    def send(case: Case) -> int:
+        return pool.urlopen(case.method, case.url, case.body, case.headers)[0]
+
+    return send
+
+
+# fork出的子进程从这里拿到发送函数和请求列表
+_worker_state: Dict[str, Any] = {}
+
+
+def _run_chunk(indexes: List[int]) -> List[Tuple[int, int, float]]:
+    send, cases, threads = _worker_state["sender"](), _worker_state["cases"], _worker_state["threads"]
+
+    def run_one(index: int) -> Tuple[int, int, float]:
+        start = time.perf_counter()
+        try:
+            status = send(cases[index])
+        except Exception:
+            status = 0
+        return index, status, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(run_one, indexes))
+
+
+def run(sender_factory: Callable[[], Sender],
+        cases: List[Case],
+        requests: int = 100,
+        threads: int = 4,
+        processes: int = 1) -> Tuple[Dict[Tuple[str, str, int], List[float]], float]:
+    """
+    每个请求发送 requests 次
+    :param sender_factory: 创建发送函数，每个进程调用一次
+    :param cases: build_cases 生成的请求
+    :param requests: 每个请求的发送次数
+    :param threads: 每个进程的线程数
+    :param processes: 进程数，大于1时需要支持fork
+    :return: ({(operation, kind, status): [latency, ...]}, elapsed)
+    """
+    _worker_state.update(sender=sender_factory, cases=cases, threads=threads)
+    indexes = [i for i in range(len(cases)) for _ in range(requests)]
+    random.Random(0).shuffle(indexes)
+
+    start = time.perf_counter()
+    if processes > 1:
+        chunks = [indexes[i::processes] for i in range(processes)]
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("fork")) as executor:
+            samples = [sample for chunk in executor.map(_run_chunk, chunks) for sample in chunk]
+    else:
+        samples = _run_chunk(indexes)
+    elapsed = time.perf_counter() - start
+
+    results: Dict[Tuple[str, str, int], List[float]] = defaultdict(list)
+    for index, status, latency in samples:
+        results[(cases[index].operation, cases[index].kind, status)].append(latency)
+    return dict(results), elapsed
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def format_report(results: Dict[Tuple[str, str, int], List[float]], elapsed: float) -> str:
+    """
+    每个接口、每种校验结果、每个状态码一行，延迟单位为毫秒，状态码0表示请求异常
+    """
+    header = f'{"operation":<40} {"kind":<8} {"status":>6} {"count":>7} {"rps":>9} {"p50":>8} {"p90":>8} {"p99":>8}'
+    lines = [header, "-" * len(header)]
+    total = 0
+    for (operation, kind, status), latencies in sorted(results.items()):
+        latencies = sorted(latencies)
+        total += len(latencies)
+        lines.append(f"{operation:<40} {kind:<8} {status:>6} {len(latencies):>7} {len(latencies) / elapsed:>9.1f} "
+                     + " ".join(f"{_percentile(latencies, p) * 1000:>8.2f}" for p in (50, 90, 99)))
+    lines.append("-" * len(header))
+    lines.append(f"total {total} requests in {elapsed:.2f}s, {total / elapsed:.1f} rps")
+    return "\n".join(lines)
+
+
+def import_time(module: str = "flask_siwadoc",
+                baseline: Tuple[str, ...] = ("flask", "pydantic"),
+                runs: int = 5) -> Dict[str, Any]:
+    """
+    在新的解释器中用 -X importtime 测量导入耗时，先导入baseline中的模块，结果只包含module额外导入的部分
+    :return: {"module", "runs", "median", "min", "modules": [(模块名, 自身耗时的中位数)]}，单位为毫秒
+    """
+    code = "".join(f"import {name};" for name in baseline) + f"import {module}"
+    totals: List[float] = []
+    self_times: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                                capture_output=True, text=True, check=True).stderr
+        # 输出按后序排列，子模块在父模块之前
+        children = []
+        for line in output.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            if name.startswith("  "):
+                children.append((name.strip(), int(self_us) / 1000))
+                continue
+            if name.strip() == module:
+                totals.append(int(cumulative_us) / 1000)
+                for child, elapsed in children + [(module, int(self_us) / 1000)]:
+                    self_times[child].append(elapsed)
+            children = []
+    modules = sorted(((name, statistics.median(values)) for name, values in self_times.items()),
+                     key=lambda item: item[1], reverse=True)
+    return {
+        "module": module,
+        "runs": runs,
+        "median": statistics.median(totals),
+        "min": min(totals),
+        "modules": modules,
+    }
+
+
+def format_import_report(result: Dict[str, Any], top: int = 15) -> str:
+    lines = [f'{"module":<50} {"self(ms)":>9}', "-" * 60]
+    for name, elapsed in result["modules"][:top]:
+        lines.append(f"{name:<50} {elapsed:>9.2f}")
+    lines.append("-" * 60)
+    lines.append(f'import {result["module"]}: median {result["median"]:.1f}ms, '
+                 f'min {result["min"]:.1f}ms over {result["runs"]} runs')
+    return "\n".join(lines)
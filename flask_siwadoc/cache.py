@@ -0,0 +1,157 @@
+"""
+GET接口的响应缓存
+
+缓存key由endpoint、路径参数和校验后的query模型组成，query参数的顺序不影响key，
+可以协商响应格式(json、msgpack)时key中包含协商的结果，响应带有 Vary: Accept
+只缓存响应体和内容相关的响应头，带有 Set-Cookie 的响应不缓存
+默认使用进程内的LRU缓存，可以实现 CacheBackend 替换成其它存储
+"""
+import abc
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pydantic_core
+from flask import Response, current_app, request
+from pydantic import BaseModel
+
+from .encoding import response_media_types
+
+__all__ = ["CacheBackend", "MemoryCache", "CachePolicy", "CachedResponse"]
+
+# 缓存中保存的响应头，其它响应头(Set-Cookie等)可能和请求的用户相关
+_CONTENT_HEADERS = frozenset(("content-type", "content-encoding", "content-language", "content-disposition"))
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    status: int
+    headers: Tuple[Tuple[str, str], ...]
+    etag: str
+    expires: float
+
+
+class CacheBackend(abc.ABC):
+    """
+    缓存后端接口
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        pass
+
+    @abc.abstractmethod
+    def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """
+    进程内的LRU缓存，超过 maxsize 时淘汰最久未使用的条目
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                return None
+            if value.expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+@dataclass
+class CachePolicy:
+    """
+    :param ttl: 缓存时间(秒)，同时作为 Cache-Control 的 max-age
+    :param backend: 缓存后端，默认使用 SiwaDoc.cache_backend
+    :param public: Cache-Control 是 public 还是 private
+    """
+    ttl: float
+    backend: Optional[CacheBackend] = None
+    public: bool = True
+
+    @property
+    def cache_control(self) -> str:
+        return f"{'public' if self.public else 'private'}, max-age={int(self.ttl)}"
+
+    def describe(self) -> Dict[str, Any]:
+        return {"ttl": self.ttl, "cacheControl": self.cache_control}
+
+
+def cache_key(query_data: Optional[Any]) -> str:
+    """
+    endpoint + 路径参数 + 校验后的query模型，没有query模型时使用排序后的查询参数
+    """
+    if isinstance(query_data, BaseModel):
+        query = query_data.model_dump_json()
+    elif query_data is not None:
+        query = pydantic_core.to_json(query_data).decode()
+    else:
+        query = json.dumps(sorted(request.args.items(multi=True)))
+    view_args = json.dumps(request.view_args or {}, sort_keys=True, default=str)
+    key = f"{request.endpoint}:{request.method}:{view_args}:{query}"
+    media_type = _negotiated_media_type()
+    return f"{key}:{media_type}" if media_type else key
+
+
+def _negotiated_media_type() -> Optional[str]:
+    """
+    响应可以协商多种格式时，返回当前请求协商的格式
+    """
+    media_types = response_media_types(current_app)
+    if len(media_types) < 2:
+        return None
+    return request.accept_mimetypes.best_match(media_types, default=media_types[0])
+
+
+def cached_response(policy: CachePolicy,
+                    backend: CacheBackend,
+                    key: str,
+                    view: Callable[[], Any]) -> Response:
+    """
+    命中缓存时直接返回缓存的响应，否则调用视图函数并缓存200响应
+    """
+    cached = backend.get(key)
+    if cached is None:
+        response = current_app.make_response(view())
+        if response.status_code != 200 or response.is_streamed or "Set-Cookie" in response.headers:
+            return response
+        body = response.get_data()
+        cached = CachedResponse(body=body,
+                                status=response.status_code,
+                                headers=tuple((k, v) for k, v in response.headers.items()
+                                              if k.lower() in _CONTENT_HEADERS),
+                                etag=hashlib.blake2b(body, digest_size=16).hexdigest(),
+                                expires=time.monotonic() + policy.ttl)
+        backend.set(key, cached, policy.ttl)
+
+    response = current_app.response_class(cached.body, status=cached.status, headers=list(cached.headers))
+    response.set_etag(cached.etag)
+    response.headers["Cache-Control"] = policy.cache_control
+    if _negotiated_media_type() is not None:
+        response.vary.add("Accept")
+    return response.make_conditional(request)
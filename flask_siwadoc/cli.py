@@ -0,0 +1,65 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+siwadoc_cli = AppGroup("siwadoc", help="flask-siwadoc commands.")
+
+
+def _get_siwa():
+    return current_app.extensions["siwadoc"]
+
+
+@siwadoc_cli.command("client")
+@click.option("-o", "--output", type=click.File("w", encoding="utf-8"), default="-",
+              help="Write the client module to this file instead of stdout.")
+@click.option("--class-name", default="Client", show_default=True, help="Name of the generated client class.")
+def client_command(output, class_name):
+    """Generate a typed python client from the openapi spec."""
+    from .codegen import generate_client
+
+    output.write(generate_client(_get_siwa(), class_name=class_name))
+
+
+@siwadoc_cli.command("mock")
+@click.option("-h", "--host", default="127.0.0.1", show_default=True)
+@click.option("-p", "--port", default=5000, show_default=True)
+@click.option("--seed", default=0, show_default=True, help="Seed of the generated responses.")
+def mock_command(host, port, seed):
+    """Run a mock server that answers every documented operation from its resp model."""
+    siwa = _get_siwa()
+    siwa.mock, siwa.mock_seed = True, seed
+    # 启动前生成全部模拟响应体
+    siwa.warmup()
+    siwa.app.run(host=host, port=port, threaded=True)
+
+
+@siwadoc_cli.command("bench")
+@click.option("--url", default=None, help="Base url of a running server, defaults to the flask test client.")
+@click.option("-n", "--requests", default=100, show_default=True, help="Requests sent per operation.")
+@click.option("-t", "--threads", default=4, show_default=True, help="Threads per process.")
+@click.option("-p", "--processes", default=1, show_default=True, help="Worker processes, requires fork.")
+@click.option("--invalid", is_flag=True, help="Also send requests that fail validation.")
+@click.option("--seed", default=0, show_default=True, help="Seed of the generated requests.")
+def bench_command(url, requests, threads, processes, invalid, seed):
+    """Load test every documented operation and report throughput and latency."""
+    from . import bench
+
+    siwa = _get_siwa()
+    cases = bench.build_cases(siwa, invalid=invalid, seed=seed)
+    app = siwa.app
+    if url:
+        sender_factory = lambda: bench.server_sender(url, threads)  # noqa: E731
+    else:
+        sender_factory = lambda: bench.app_sender(app)  # noqa: E731
+    results, elapsed = bench.run(sender_factory, cases, requests=requests, threads=threads, processes=processes)
+    click.echo(bench.format_report(results, elapsed))
+
+
+@siwadoc_cli.command("importtime", with_appcontext=False)
+@click.option("-n", "--runs", default=5, show_default=True, help="Fresh interpreters to measure.")
+@click.option("--module", default="flask_siwadoc", show_default=True, help="Module to import.")
+def importtime_command(runs, module):
+    """Measure the import time of flask-siwadoc on top of flask and pydantic."""
+    from . import bench
+
+    click.echo(bench.format_import_report(bench.import_time(module, runs=runs)))
@@ -0,0 +1,236 @@
+"""
+生成的客户端代码依赖的运行时
+
+连接池基于标准库 http.client，同一个host的连接在请求结束后放回池中复用(keep-alive)，
+响应体通过 resp 模型的 model_validate_json 直接解析成pydantic对象
+"""
+import http.client
+import json
+import mimetypes
+import os
+import queue
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+from urllib.parse import quote, urlencode, urlsplit
+
+import pydantic_core
+from pydantic import BaseModel
+
+from .registry import type_adapter
+
+__all__ = ["BaseClient", "ClientError", "ConnectionPool"]
+
+# 复用的空闲连接可能已被服务端关闭，遇到这些异常时换一个新连接重试一次
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class ClientError(Exception):
+    """
+    服务端返回4xx、5xx时抛出
+    """
+
+    def __init__(self, status: int, body: bytes, headers: Mapping[str, str]):
+        self.status = status
+        self.body = body
+        self.headers = headers
+        super().__init__(f"{status}: {body[:200]!r}")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class ConnectionPool:
+    """
+    单个host的连接池，最多同时打开 maxsize 个连接，空闲连接后进先出以保持热连接
+    """
+
+    def __init__(self, base_url: str, maxsize: int = 10, timeout: float = 10.0):
+        url = urlsplit(base_url)
+        self.scheme = url.scheme or "http"
+        self.host = url.hostname
+        self.port = url.port
+        self.base_path = url.path.rstrip("/")
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(maxsize)
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        conn_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return conn_class(self.host, self.port, timeout=self.timeout)
+
+    def urlopen(self, method: str, url: str, body: Optional[bytes] = None,
+                headers: Optional[Mapping[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        :return: (status, headers, body)
+        """
+        with self._slots:
+            try:
+                conn, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                conn, reused = self._new_connection(), False
+            try:
+                response = self._send(conn, method, url, body, headers)
+            except _STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                conn = self._new_connection()
+                response = self._send(conn, method, url, body, headers)
+            except Exception:
+                conn.close()
+                raise
+            status, response_headers, data, will_close = response
+            if will_close:
+                conn.close()
+            else:
+                self._idle.put(conn)
+            return status, response_headers, data
+
+    def _send(self, conn, method, url, body, headers):
+        conn.request(method, self.base_path + url, body=body, headers=dict(headers or {}))
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, {k.lower(): v for k, v in response.getheaders()}, data, response.will_close
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def _dump(data) -> Dict[str, Any]:
+    if isinstance(data, BaseModel):
+        return data.model_dump(mode="json", exclude_none=True)
+    if not isinstance(data, Mapping):
+        # dataclass 等其它类型
+        data = pydantic_core.to_jsonable_python(data)
+    return {k: v for k, v in dict(data).items() if v is not None}
+
+
+def _flatten_form(fields: Mapping[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """
+    嵌套的对象和对象列表展开成 user.name、items[0].name 形式的字段，与服务端 utils.convert_form_params 对应
+    """
+    flat = {}
+    for name, value in fields.items():
+        key = f"{prefix}.{name}" if prefix else name
+        if isinstance(value, Mapping):
+            flat.update(_flatten_form(value, key))
+        elif isinstance(value, (list, tuple)) and any(isinstance(item, Mapping) for item in value):
+            for i, item in enumerate(value):
+                if isinstance(item, Mapping):
+                    flat.update(_flatten_form(item, f"{key}[{i}]"))
+                else:
+                    flat[f"{key}[{i}]"] = item
+        else:
+            flat[key] = value
+    return flat
+
+
+def _encode_multipart(fields: Mapping[str, Any], files: Mapping[str, Any]) -> Tuple[bytes, str]:
+    """
+    编码 multipart/form-data 请求体
+    文件可以是 bytes、文件对象或者 (filename, content[, content_type])，多个文件用列表
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in _flatten_form(fields).items():
+        for item in value if isinstance(value, (list, tuple)) else [value]:
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode())
+            parts.append(f'{item}\r\n'.encode())
+    for name, value in files.items():
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, tuple):
+                filename, content = item[0], item[1]
+                content_type = item[2] if len(item) > 2 else None
+            else:
+                filename = os.path.basename(getattr(item, "name", name))
+                content, content_type = item, None
+            if hasattr(content, "read"):
+                content = content.read()
+            content_type = content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                         f'Content-Type: {content_type}\r\n\r\n'.encode())
+            parts.append(content)
+            parts.append(b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class BaseClient:
+    """
+    生成的客户端的基类，所有接口方法共享同一个连接池
+    """
+
+    def __init__(self,
+                 base_url: str,
+                 pool_size: int = 10,
+                 timeout: float = 10.0,
+                 headers: Optional[Mapping[str, str]] = None):
+        self.pool = ConnectionPool(base_url, maxsize=pool_size, timeout=timeout)
+        self.pool_size = pool_size
+        self.headers = dict(headers or {})
+
+    def request(self,
+                method: str,
+                path: str,
+                path_params: Optional[Mapping[str, Any]] = None,
+                query=None,
+                header=None,
+                cookie=None,
+                body=None,
+                form=None,
+                files: Optional[Mapping[str, Any]] = None,
+                headers: Optional[Mapping[str, str]] = None,
+                resp: Any = None) -> Any:
+        if path_params:
+            path = path.format(**{k: quote(str(v), safe="") for k, v in path_params.items()})
+        if query is not None:
+            query_string = urlencode(_dump(query), doseq=True)
+            if query_string:
+                path = f"{path}?{query_string}"
+
+        request_headers = {**self.headers, **(headers or {})}
+        if header is not None:
+            request_headers.update({k: str(v) for k, v in _dump(header).items()})
+        if cookie is not None:
+            request_headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in _dump(cookie).items())
+
+        payload = None
+        if body is not None:
+            payload = body.model_dump_json().encode() if isinstance(body, BaseModel) else pydantic_core.to_json(body)
+            request_headers["Content-Type"] = "application/json"
+        elif form is not None or files:
+            payload, request_headers["Content-Type"] = _encode_multipart(_dump(form or {}), files or {})
+
+        status, response_headers, data = self.pool.urlopen(method, path, payload, request_headers)
+        if status >= 400:
+            raise ClientError(status, data, response_headers)
+        if isinstance(resp, type) and issubclass(resp, BaseModel):
+            return resp.model_validate_json(data)
+        if resp is not None:
+            return type_adapter(resp).validate_json(data)
+        if response_headers.get("content-type", "").startswith("application/json"):
+            return json.loads(data)
+        return data.decode()
+
+    def batch(self, calls: Iterable[Callable[[], Any]], max_workers: Optional[int] = None) -> List[Any]:
+        """
+        并发执行一批调用，按传入顺序返回结果，并发数默认等于连接池大小
+        例如：client.batch([lambda: client.users(user_id=1), lambda: client.users(user_id=2)])
+        """
+        with ThreadPoolExecutor(max_workers=max_workers or self.pool_size) as executor:
+            return list(executor.map(lambda call: call(), calls))
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
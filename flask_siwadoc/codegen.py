@@ -0,0 +1,123 @@
+"""
+根据openapi文档生成python客户端代码
+
+生成的客户端直接import视图中使用的pydantic模型，运行时依赖 flask_siwadoc.client
+"""
+import keyword
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Type
+
+from pydantic import BaseModel
+
+from . import utils
+from .client import BaseClient
+from .registry import is_model
+
+_SCHEMA_TYPES = {"integer": "int", "number": "float", "string": "str", "boolean": "bool"}
+
+
+def _importable(model: Type[BaseModel]) -> Optional[Type[BaseModel]]:
+    """
+    返回可以被import的模型，__main__ 或函数内定义的模型无法import
+    """
+    # List[Item] 等非模型类型没有对应的类可以import
+    if not is_model(model) or model is BaseModel or model.__module__ == "__main__" \
+            or not model.__qualname__.isidentifier():
+        return None
+    return model
+
+
+def _method_names(operations) -> List[str]:
+    def base_name(rule, method, func):
+        # MethodView的方法名就是请求方法，改用endpoint命名
+        if func.__name__.upper() == method:
+            return f"{rule.endpoint.replace('.', '_')}_{method.lower()}"
+        return func.__name__
+
+    counter = Counter(base_name(*operation) for operation in operations)
+    names = []
+    for rule, method, func in operations:
+        name = base_name(rule, method, func)
+        if counter[name] > 1 or keyword.iskeyword(name) or hasattr(BaseClient, name):
+            name = utils.get_operation_id(func, method)
+        names.append(name)
+    return names
+
+
+def generate_client(siwa, class_name: str = "Client") -> str:
+    """
+    生成客户端模块源码
+    :param siwa: SiwaDoc实例
+    :param class_name: 生成的客户端类名
+    """
+    spec = siwa.openapi
+    operations = list(siwa.operations())
+    imports: Dict[str, Set[str]] = defaultdict(set)
+
+    def annotation(name: Optional[str]) -> Optional[str]:
+        model = _importable(siwa.models.model(name)) if name else None
+        if model is None:
+            return None
+        imports[model.__module__].add(model.__qualname__)
+        return model.__qualname__
+
+    methods = []
+    for (rule, method, func), method_name in zip(operations, _method_names(operations)):
+        path, _ = utils.parse_route(str(rule))
+        operation = spec["paths"][path][method.lower()]
+
+        arguments, call = ["self"], [f'"{method}"', f'"{path}"']
+        path_params = [p for p in operation["parameters"] if p["in"] == "path"]
+        for param in path_params:
+            arguments.append(f'{param["name"]}: {_SCHEMA_TYPES.get(param["schema"].get("type"), "str")}')
+        if path_params:
+            call.append("path_params={" + ", ".join(f'"{p["name"]}": {p["name"]}' for p in path_params) + "}")
+        # 其余参数只能以关键字方式传入
+        arguments.append("*")
+
+        for location in ("query", "header", "cookie", "body", "form"):
+            if not hasattr(func, location):
+                continue
+            model_annotation = annotation(getattr(func, location))
+            if model_annotation is None and not is_model(siwa.models.model(getattr(func, location))):
+                arguments.append(f"{location}: Any = None")
+            elif model_annotation is None:
+                arguments.append(f"{location}: Optional[Dict[str, Any]] = None")
+            elif any(f.is_required() for f in siwa.models.model(getattr(func, location)).model_fields.values()):
+                arguments.append(f"{location}: {model_annotation}")
+            else:
+                arguments.append(f"{location}: Optional[{model_annotation}] = None")
+            call.append(f"{location}={location}")
+        if getattr(func, "files", None):
+            arguments.append("files: Optional[Dict[str, Any]] = None")
+            call.append("files=files")
+        arguments.append("headers: Optional[Dict[str, str]] = None")
+        call.append("headers=headers")
+
+        resp_annotation = annotation(getattr(func, "resp", None))
+        if resp_annotation and getattr(func, "resp_many", False):
+            resp_annotation = f"List[{resp_annotation}]"
+        if resp_annotation:
+            call.append(f"resp={resp_annotation}")
+
+        methods.append(
+            f'    def {method_name}({", ".join(arguments)}) -> {resp_annotation or "Any"}:\n'
+            f'        """\n'
+            f'        {method} {path}  {operation["summary"]}\n'
+            f'        """\n'
+            f'        return self.request({", ".join(call)})\n'
+        )
+
+    lines = [
+        '"""',
+        f'{spec["info"]["title"]} {spec["info"]["version"]} client',
+        '',
+        'Generated by flask-siwadoc, do not edit.',
+        '"""',
+        'from typing import Any, Dict, List, Optional',
+        '',
+        'from flask_siwadoc.client import BaseClient',
+    ]
+    lines.extend(f'from {module} import {", ".join(sorted(names))}' for module, names in sorted(imports.items()))
+    lines.extend(['', '', f'class {class_name}(BaseClient):', ''])
+    return "\n".join(lines) + "\n" + ("\n".join(methods) or "    pass\n")
@@ -0,0 +1,145 @@
+"""
+更快的响应编码
+
+pydantic模型直接用 pydantic-core 序列化，dict、list 等优先用 orjson，
+安装了 msgpack 时根据请求头 Accept 协商返回 application/msgpack
+orjson 和 msgpack 都是可选依赖，在创建 SiwaJSONProvider 时才导入
+"""
+import functools
+import importlib
+import json
+import typing as t
+
+import pydantic_core
+from flask import Flask, Response, current_app, has_request_context, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from pydantic import BaseModel
+
+__all__ = ["SiwaJSONProvider", "MSGPACK_MIMETYPE", "NDJSON_MIMETYPE", "response_media_types", "make_response",
+           "stream_response"]
+
+MSGPACK_MIMETYPE = "application/msgpack"
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# 流式输出时攒够这么多字节再发送一次，避免每条数据一次write
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def _optional(name: str) -> t.Any:
+    """
+    导入可选依赖，没有安装时返回None
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:  # pragma: no cover
+        return None
+
+
+def _default(obj: t.Any) -> t.Any:
+    return pydantic_core.to_jsonable_python(obj)
+
+
+def response_media_types(app: Flask) -> t.List[str]:
+    """
+    app的响应可以协商的媒体类型，用于生成文档
+    """
+    if isinstance(app.json, SiwaJSONProvider) and app.json.msgpack is not None:
+        return ["application/json", MSGPACK_MIMETYPE]
+    return ["application/json"]
+
+
+def make_response(rv: t.Any) -> t.Any:
+    """
+    视图函数返回pydantic模型、模型列表、值为模型的字典（或者(模型, 状态码)元组）时转换成响应，其它返回值交给flask处理
+    """
+    body = rv[0] if isinstance(rv, tuple) and rv else rv
+    is_model_list = isinstance(body, list) and body and isinstance(body[0], BaseModel)
+    is_model_dict = isinstance(body, dict) and body and isinstance(next(iter(body.values())), BaseModel)
+    if not (is_model_list or is_model_dict or isinstance(body, BaseModel)):
+        return rv
+    if not isinstance(current_app.json, SiwaJSONProvider):
+        body = _default(body)
+    response = current_app.json.response(body)
+    return (response,) + rv[1:] if isinstance(rv, tuple) else response
+
+
+def _iter_chunks(items: t.Iterator[t.Any], ndjson: bool) -> t.Iterator[bytes]:
+    buffer = bytearray(b"" if ndjson else b"[")
+    separator = b"\n" if ndjson else b","
+    first = True
+    for item in items:
+        if not ndjson and not first:
+            buffer += separator
+        first = False
+        if isinstance(item, BaseModel):
+            buffer += item.__pydantic_serializer__.to_json(item)
+        else:
+            buffer += pydantic_core.to_json(item)
+        if ndjson:
+            buffer += separator
+        if len(buffer) >= STREAM_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if not ndjson:
+        buffer += b"]"
+    if buffer:
+        yield bytes(buffer)
+
+
+def stream_response(items: t.Iterator[t.Any]) -> Response:
+    """
+    流式输出生成器中的数据，每条数据单独序列化
+    请求头 Accept 为 application/x-ndjson 时每行一条数据，否则输出一个json数组
+    """
+    ndjson = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+    return current_app.response_class(stream_with_context(_iter_chunks(items, ndjson)),
+                                      mimetype=NDJSON_MIMETYPE if ndjson else "application/json")
+
+
+class SiwaJSONProvider(DefaultJSONProvider):
+    """
+    app.json = SiwaJSONProvider(app)
+
+    视图函数可以直接返回pydantic模型、模型列表或者包含模型的dict
+    """
+
+    def __init__(self, app: Flask) -> None:
+        super().__init__(app)
+        self.orjson = _optional("orjson")
+        self.msgpack = _optional("msgpack")
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        if kwargs:
+            # 指定了json.dumps的参数时沿用标准库
+            kwargs.setdefault("default", _default)
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj: t.Any, indent: bool = False) -> bytes:
+        if isinstance(obj, BaseModel):
+            return obj.__pydantic_serializer__.to_json(obj, indent=2 if indent else None)
+        orjson = self.orjson
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=_default, option=option)
+            except TypeError:
+                # 超过64位的整数orjson不支持，也不会调用default，交给标准库处理
+                return json.dumps(obj, default=_default, sort_keys=self.sort_keys, ensure_ascii=self.ensure_ascii,
+                                  indent=2 if indent else None, separators=None if indent else (",", ":")).encode()
+        return pydantic_core.to_json(obj, indent=2 if indent else None)
+
+    def response(self, *args: t.Any, **kwargs: t.Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        msgpack = self.msgpack
+        if msgpack is not None and has_request_context():
+            best = request.accept_mimetypes.best_match(["application/json", MSGPACK_MIMETYPE])
+            if best == MSGPACK_MIMETYPE:
+                return self._app.response_class(msgpack.packb(_default(obj)), mimetype=MSGPACK_MIMETYPE)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,177 @@
+"""
+校验失败日志
+
+校验失败时生成结构化的记录(接口、参数位置、错误字段和类型、客户端、截断后的输入)，
+放入有界队列，由后台线程批量写入sink，默认写入json lines文件
+每个接口按令牌桶限速，超过速率或者队列满时丢弃并计数，不会阻塞请求，也不会在被攻击时写满磁盘
+"""
+import abc
+import json
+import queue
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import request
+from pydantic import ValidationError as PydanticError
+
+from .worker import QueueWorker
+
+__all__ = ["FailureLogger", "Sink", "JsonLinesSink"]
+
+# 后台线程每次最多写入的记录数
+BATCH_SIZE = 100
+
+
+class Sink(abc.ABC):
+    """
+    校验失败记录的输出接口
+    """
+
+    @abc.abstractmethod
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JsonLinesSink(Sink):
+    """
+    每条记录一行json，追加写入文件
+    """
+
+    def __init__(self, path: str = "siwadoc-failures.jsonl"):
+        self.path = path
+        self._file = None
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records))
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def default_client_id() -> Optional[str]:
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded:
+        return forwarded.split(",", 1)[0].strip()
+    return request.remote_addr
+
+
+class FailureLogger(QueueWorker):
+    """
+    :param sink: 记录的输出，默认写入当前目录的 siwadoc-failures.jsonl
+    :param maxsize: 队列长度，队列满时丢弃记录
+    :param rate: 每个接口每秒最多记录的失败数，允许同样大小的突发
+    :param max_input: 记录的输入的最大字符数
+    :param client_id: 返回当前请求的客户端标识，默认为 X-Forwarded-For 中的第一个地址或者 remote_addr
+    """
+
+    def __init__(self,
+                 sink: Optional[Sink] = None,
+                 maxsize: int = 10000,
+                 rate: float = 10.0,
+                 max_input: int = 256,
+                 client_id: Callable[[], Optional[str]] = default_client_id):
+        super().__init__(1, maxsize, "siwadoc-failures")
+        self.sink = sink or JsonLinesSink()
+        self.rate = rate
+        self.max_input = max_input
+        self.client_id = client_id
+        self._buckets: Dict[str, List[float]] = {}
+        self.logged = 0
+        self.dropped_rate: Counter = Counter()
+        self.dropped_queue = 0
+        self.sink_errors = 0
+
+    def _allow(self, operation: str) -> bool:
+        """
+        令牌桶限速
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(operation)
+            if bucket is None:
+                bucket = self._buckets[operation] = [self.rate, now]
+            tokens = min(self.rate, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                self.dropped_rate[operation] += 1
+                return False
+            bucket[0] = tokens - 1
+            return True
+
+    def _truncate(self, data: Any) -> str:
+        if isinstance(data, bytes):
+            text = data[:self.max_input * 4].decode("utf-8", "replace")
+        elif isinstance(data, str):
+            text = data
+        else:
+            text = json.dumps(data, ensure_ascii=False, default=str)
+        return text[:self.max_input]
+
+    def record(self, operation: str, location: str, error: PydanticError, data: Any = None) -> bool:
+        """
+        在请求中调用，生成记录并放入队列，被限速或者队列满时返回False
+        :param operation: 接口的operation id
+        :param location: 校验失败的参数位置，query、path、body、form、files
+        :param error: 校验错误
+        :param data: 原始输入，截断后记录
+        """
+        if not self._allow(operation):
+            return False
+        try:
+            errors = [{"loc": list(e["loc"]), "type": e["type"]} for e in error.errors(include_url=False)]
+        except Exception:
+            errors = [{"loc": [], "type": type(error).__name__}]
+        record = {
+            "time": time.time(),
+            "operation": operation,
+            "method": request.method,
+            "path": request.path,
+            "location": location,
+            "errors": errors,
+            "client": self.client_id(),
+            "input": self._truncate(data) if data is not None else None,
+        }
+        if not self._put(record):
+            with self._lock:
+                self.dropped_queue += 1
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            records = [self._queue.get()]
+            while len(records) < BATCH_SIZE:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.sink.write(records)
+                with self._lock:
+                    self.logged += len(records)
+            except Exception:
+                with self._lock:
+                    self.sink_errors += len(records)
+            finally:
+                for _ in records:
+                    self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "logged": self.logged,
+                "dropped_rate": sum(self.dropped_rate.values()),
+                "dropped_queue": self.dropped_queue,
+                "sink_errors": self.sink_errors,
+                "dropped_by_operation": dict(self.dropped_rate),
+            }
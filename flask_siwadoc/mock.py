@@ -0,0 +1,123 @@
+"""
+根据 json schema 生成模拟数据，用于 mock 模式
+
+同一个schema和seed生成的数据是确定的
+"""
+import datetime
+import json
+import random
+import uuid
+import zlib
+from typing import Any, Mapping, Optional, Type
+
+from pydantic import BaseModel
+
+from .registry import model_schema
+
+# 递归模型超过该深度后不再展开
+MAX_DEPTH = 5
+
+_STRING_FORMATS = {
+    "date-time": lambda rng: datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(
+        seconds=rng.randint(0, 10 ** 8)),
+    "date": lambda rng: datetime.date(2020, 1, 1) + datetime.timedelta(days=rng.randint(0, 3650)),
+    "time": lambda rng: datetime.time(rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59)),
+    "email": lambda rng: f"user{rng.randint(1, 9999)}@example.com",
+    "uuid": lambda rng: uuid.UUID(int=rng.getrandbits(128), version=4),
+    "uri": lambda rng: f"https://example.com/{rng.randint(1, 9999)}",
+    "ipv4": lambda rng: ".".join(str(rng.randint(1, 254)) for _ in range(4)),
+}
+
+
+def _resolve(schema: Mapping[str, Any], defs: Mapping[str, Any]) -> Mapping[str, Any]:
+    ref = schema.get("$ref")
+    if ref:
+        return defs.get(ref.rsplit("/", 1)[-1], {})
+    return schema
+
+
+def generate_example(schema: Mapping[str, Any],
+                     rng: random.Random,
+                     defs: Optional[Mapping[str, Any]] = None,
+                     depth: int = 0) -> Any:
+    """
+    根据 json schema 生成一个模拟值
+    :param schema: json schema
+    :param rng: 随机数生成器，决定生成的结果
+    :param defs: 被 $ref 引用的schema
+    :param depth: 当前嵌套深度
+    """
+    defs = defs if defs is not None else schema.get("$defs", {})
+    schema = _resolve(schema, defs)
+    if "const" in schema:
+        return schema["const"]
+    if "examples" in schema and schema["examples"]:
+        return schema["examples"][0]
+    if "default" in schema:
+        return schema["default"]
+    if "enum" in schema:
+        return rng.choice(list(schema["enum"]))
+    if "discriminator" in schema and "oneOf" in schema:
+        # 每个成员都可能出现
+        return generate_example(rng.choice(schema["oneOf"]), rng, defs, depth)
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return generate_example(options[0], rng, defs, depth)
+    if "allOf" in schema:
+        merged = {}
+        for sub in schema["allOf"]:
+            merged.update(_resolve(sub, defs))
+        return generate_example(merged, rng, defs, depth)
+
+    _type = schema.get("type")
+    if isinstance(_type, list):
+        _type = next((t for t in _type if t != "null"), None)
+    if _type == "object" or "properties" in schema:
+        if depth >= MAX_DEPTH:
+            return {}
+        return {name: generate_example(sub, rng, defs, depth + 1)
+                for name, sub in schema.get("properties", {}).items()}
+    if _type == "array":
+        if depth >= MAX_DEPTH:
+            return []
+        size = max(schema.get("minItems", 1), min(schema.get("maxItems", 3), 3))
+        return [generate_example(schema.get("items", {}), rng, defs, depth + 1) for _ in range(size)]
+    if _type in ("integer", "number"):
+        step = 1 if _type == "integer" else 0.01
+        low = schema.get("minimum", schema.get("exclusiveMinimum", 0) + step)
+        high = schema.get("maximum", schema.get("exclusiveMaximum", low + 1000 + step) - step)
+        if _type == "integer":
+            return rng.randint(int(low), int(max(low, high)))
+        return round(rng.uniform(low, max(low, high)), 2)
+    if _type == "boolean":
+        return rng.random() < 0.5
+    if _type == "null":
+        return None
+    if _type == "string":
+        fmt = _STRING_FORMATS.get(schema.get("format"))
+        if fmt:
+            value = fmt(rng)
+            return value.isoformat() if hasattr(value, "isoformat") else str(value)
+        min_length = schema.get("minLength", 0)
+        max_length = max(schema.get("maxLength", 12), min_length)
+        length = min(max(min_length, 8), max_length)
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(length))
+    return None
+
+
+def generate_body(model: Type[BaseModel], key: str, seed: int = 0, many: bool = False) -> bytes:
+    """
+    生成模型对应的模拟响应体
+    :param model: resp模型
+    :param key: 接口标识，与seed一起决定生成的数据
+    :param seed: 随机种子
+    :param many: 是否生成模型列表
+    """
+    rng = random.Random(zlib.crc32(key.encode()) ^ seed)
+    schema, definitions = model_schema(model)
+    if many:
+        example = [generate_example(schema, rng, definitions) for _ in range(3)]
+    else:
+        example = generate_example(schema, rng, definitions)
+    return json.dumps(example, ensure_ascii=False).encode()
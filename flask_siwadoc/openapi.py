@@ -1,136 +1,271 @@
 import copy
+import hashlib
+import json
 from collections import defaultdict
-from typing import Dict, List, Any
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Mapping, Optional, Tuple
 
 from flask import Flask
+from werkzeug.routing import Rule
 
-from . import utils
+from . import utils, encoding
+
+
+@dataclass(frozen=True)
+class Operation:
+    """
+    接口的元数据，和文档一起生成，中间件(指标、鉴权、限流等)可以通过 SiwaDoc.current_operation() 获取
+    :param models: 参数位置(query、path、body、resp等)到组件名的映射
+    """
+    endpoint: str
+    method: str
+    path: str
+    operation_id: str
+    summary: str
+    tags: Tuple[str, ...]
+    group: str
+    models: Mapping[str, str]
+    func: Callable = field(repr=False, compare=False)
+
+
+def iter_operations(app: Flask,
+                    blueprint: Optional[str] = None,
+                    owner: Any = None) -> Iterator[Tuple[Rule, str, Callable]]:
+    """
+    遍历所有被siwadoc装饰的视图函数，MethodView按请求方法拆分
+    :param app:
+    :param blueprint: 只遍历该蓝图(包括嵌套的子蓝图)的路由
+    :param owner: 只遍历被该SiwaDoc实例装饰的视图函数
+    :return: (rule, method, func)
+    """
+    prefix = f"{blueprint}." if blueprint else None
+    for rule in app.url_map.iter_rules():
+        if prefix is not None and not rule.endpoint.startswith(prefix):
+            continue
+        # 视图函数
+        view_func = app.view_functions[rule.endpoint]
+        view_class = getattr(view_func, "view_class", None)
+        for method in sorted(rule.methods):
+            if method in ['HEAD', 'OPTIONS']:
+                continue
+            func = getattr(view_class, method.lower(), None) if view_class else view_func
+            # 只有被siwadoc装饰了函数才加入openapi
+            if not getattr(func, '_decorated', None):
+                continue
+            if owner is not None and getattr(func, '_siwadoc', owner) is not owner:
+                continue
+            yield rule, method, func
+
+
+_MODEL_LOCATIONS = ('query', 'path', 'header', 'cookie', 'body', 'form', 'resp')
+
+# 影响文档内容的装饰器参数
+_FINGERPRINT_ATTRS = _MODEL_LOCATIONS + ('files', 'resp_many', 'cache', 'limits', 'mode', 'x')
+
+
+def _operation_tags(func) -> Tuple[str, List[str]]:
+    """
+    :return: (group, tags)，没有指定tags时使用 group/default
+    """
+    if not hasattr(func, 'tags'):
+        func.tags = ['default']
+    if not hasattr(func, 'group'):
+        func.group = ''
+
+    func_group = getattr(func, 'group', "")
+    func_tags = [tag if tag != 'default' else func_group + "/" + tag for tag in
+                 getattr(func, 'tags', ['default'])]
+    return func_group, func_tags
+
+
+def operation_record(rule: Rule, method: str, func: Callable) -> Operation:
+    path, _ = utils.parse_route(str(rule))
+    func_group, func_tags = _operation_tags(func)
+    return Operation(
+        endpoint=rule.endpoint,
+        method=method,
+        path=path,
+        operation_id=utils.get_operation_id(func, method),
+        summary=utils.get_operation_summary(func),
+        tags=tuple(func_tags),
+        group=func_group,
+        models={location: getattr(func, location) for location in _MODEL_LOCATIONS if hasattr(func, location)},
+        func=func,
+    )
+
+
+def build_index(operations: Iterable[Tuple[Rule, str, Callable]]) -> Dict[Tuple[str, str], Operation]:
+    """
+    不生成文档，只建立 (endpoint, method) 到 Operation 的索引
+    """
+    return {(rule.endpoint, method): operation_record(rule, method, func) for rule, method, func in operations}
+
+
+def fingerprint(operations: Iterable[Tuple[Rule, str, Callable]],
+                models: Mapping[str, Dict],
+                **options: Any) -> str:
+    """
+    根据路由、装饰器参数、模型的schema和文档选项计算文档的指纹，输入相同时生成的文档相同
+    只读取已有的元数据，不生成文档
+    :param options: title、version等生成文档的其它参数
+    """
+    routes = []
+    for rule, method, func in operations:
+        routes.append([
+            str(rule),
+            rule.endpoint,
+            method,
+            utils.parse_path_params(str(rule))[1],
+            utils.get_operation_summary(func),
+            utils.get_operation_description(func),
+            utils.get_operation_id(func, method),
+            _operation_tags(func),
+            {attr: getattr(func, attr) for attr in _FINGERPRINT_ATTRS if hasattr(func, attr)},
+        ])
+    data = {
+        "routes": routes,
+        "schemas": dict(models),
+        "definitions": getattr(models, 'definitions', {}),
+        "options": options,
+    }
+    encoded = json.dumps(data, sort_keys=True, default=utils.json_default, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
 
 
 def generate_openapi(title: str,
                      version: str,
                      openapi_version: str,
                      app: Flask,
-                     models: Dict[str, Dict],
-                     description: str = None) -> Dict[str, Any]:
+                     models: Mapping[str, Dict],
+                     description: str = None,
+                     response_media_types: List[str] = ("application/json",),
+                     operations: Optional[Iterable[Tuple[Rule, str, Callable]]] = None,
+                     index: Optional[Dict[Tuple[str, str], Operation]] = None) -> Dict[str, Any]:
     """
     :param title:
     :param version:
     :param openapi_version:
     :param app:
-    :param models:
+    :param models: 组件名到schema的映射，通常是 registry.ModelRegistry
     :param description:
+    :param response_media_types: 响应支持的媒体类型，resp模型在每种类型下使用相同的schema
+    :param operations: 需要生成文档的接口，默认为app中所有被siwadoc装饰的接口
+    :param index: 传入时填充 (endpoint, method) 到 Operation 的索引
     """
 
     routes: Dict[str:Dict] = dict()
     tags: Dict[str:Dict] = dict()
     groups: Dict[str:List] = defaultdict(list)
-    for rule in app.url_map.iter_rules():
-        # 视图函数
-        func = old_func = app.view_functions[rule.endpoint]
+    if operations is None:
+        operations = iter_operations(app)
+    for rule, method, func in operations:
         path, parameters = utils.parse_path_params(str(rule))
-        methods = rule.methods
-        for method in methods:
-            if method in ['HEAD', 'OPTIONS']:
-                continue
-            if getattr(old_func, "view_class", None):
-                cls = getattr(old_func, "view_class")
-                func = getattr(cls, method.lower(), None)
-            # 只有被siwadoc装饰了函数才加入openapi
-            if not getattr(func, '_decorated', None):
-                continue
-            if not hasattr(func, 'tags'):
-                func.tags = ['default']
-            if not hasattr(func, 'group'):
-                func.group = ''
-
-            func_group = getattr(func, 'group', "")
-            func_tags = [tag if tag != 'default' else func_group + "/" + tag for tag in
-                         getattr(func, 'tags', ['default'])]
-
-            groups[func_group].extend(func_tags)
-            tags.update({tag: {"name": tag} for tag in func_tags})
-            operation = {
-                'summary': utils.get_operation_summary(func),
-                'description': utils.get_operation_description(func),
-                'operationID': func.__name__ + '__' + method.lower(),
-                'tags': func_tags,
-            }
+        func_group, func_tags = _operation_tags(func)
+
+        groups[func_group].extend(func_tags)
+        tags.update({tag: {"name": tag} for tag in func_tags})
+        operation = {
+            'summary': utils.get_operation_summary(func),
+            'description': utils.get_operation_description(func),
+            'operationID': utils.get_operation_id(func, method),
+            'tags': func_tags,
+        }
 
-            if hasattr(func, 'body'):
-                operation['requestBody'] = {
-                    'content': {
-                        'application/json': {
-                            'schema': {
-                                '$ref': f'#/components/schemas/{func.body}'
-                            }
+        if hasattr(func, 'body'):
+            operation['requestBody'] = {
+                'content': {
+                    'application/json': {
+                        'schema': {
+                            '$ref': f'#/components/schemas/{func.body}'
                         }
                     }
                 }
+            }
 
-            if hasattr(func, 'form'):
-                operation['requestBody'] = {
-                    'content': {
-                        'multipart/form-data': {
-                            'schema': {
-                                '$ref': f'#/components/schemas/{func.form}'
-                            }
+        if hasattr(func, 'form'):
+            operation['requestBody'] = {
+                'content': {
+                    'multipart/form-data': {
+                        'schema': {
+                            '$ref': f'#/components/schemas/{func.form}'
                         }
                     }
                 }
+            }
 
-            parameters = copy.deepcopy(parameters)
-            if hasattr(func, 'query'):
-                parameters.extend(utils.parse_other_params('query', models[func.query]))
-            if hasattr(func, 'header'):
-                parameters.extend(utils.parse_other_params('header', models[func.header]))
-            if hasattr(func, 'cookie'):
-                parameters.extend(utils.parse_other_params('cookie', models[func.cookie]))
-            operation['parameters'] = parameters
-
-            operation['responses'] = {}
-            has_2xx = False
-            if hasattr(func, 'x'):
-                for code, msg in func.x.items():
-                    if code.startswith('2'):
-                        has_2xx = True
-                    operation['responses'][code] = {
-                        'description': msg,
-                    }
+        parameters = copy.deepcopy(parameters)
+        if hasattr(func, 'path'):
+            utils.merge_path_params(parameters, models[func.path])
+        if hasattr(func, 'query'):
+            parameters.extend(utils.parse_other_params('query', models[func.query]))
+        if hasattr(func, 'header'):
+            parameters.extend(utils.parse_other_params('header', models[func.header]))
+        if hasattr(func, 'cookie'):
+            parameters.extend(utils.parse_other_params('cookie', models[func.cookie]))
+        operation['parameters'] = parameters
 
-            if hasattr(func, 'resp'):
-                operation['responses']['200'] = {
-                    'description': 'Successful Response',
-                    'content': {
-                        'application/json': {
-                            'schema': {
-                                '$ref': f'#/components/schemas/{func.resp}'
-                            }
-                        }
-                    },
+        operation['responses'] = {}
+        has_2xx = False
+        if hasattr(func, 'x'):
+            for code, msg in func.x.items():
+                if code.startswith('2'):
+                    has_2xx = True
+                operation['responses'][code] = {
+                    'description': msg,
                 }
-            elif not has_2xx:
-                operation['responses']['200'] = {'description': 'Successful Response'}
-
-            if any([hasattr(func, schema) for schema in ('query', 'body', 'form')]):
-                operation['responses']['400'] = {
-                    'description': 'Validation Error',
-                    'content': {
-                        'application/json': {
-                            'schema': {
-                                "code": 200,
-                            }
-                        }
-                    },
+
+        if hasattr(func, 'resp'):
+            resp_schema = {'$ref': f'#/components/schemas/{func.resp}'}
+            if getattr(func, 'resp_many', False):
+                # 数组响应可以流式输出为json数组或者ndjson(每行一个对象)
+                content = {media_type: {'schema': {'type': 'array', 'items': resp_schema}}
+                           for media_type in response_media_types}
+                content[encoding.NDJSON_MIMETYPE] = {'schema': resp_schema}
+            else:
+                content = {media_type: {'schema': resp_schema} for media_type in response_media_types}
+            operation['responses']['200'] = {
+                'description': 'Successful Response',
+                'content': content,
+            }
+        elif not has_2xx:
+            operation['responses']['200'] = {'description': 'Successful Response'}
+
+        if hasattr(func, 'cache') and method == 'GET':
+            operation['x-cache'] = func.cache
+            if '200' in operation['responses']:
+                operation['responses']['200']['headers'] = {
+                    'ETag': {'schema': {'type': 'string'}},
+                    'Cache-Control': {'schema': {'type': 'string', 'example': func.cache['cacheControl']}},
                 }
-            routes.setdefault(path, {})[method.lower()] = operation
-
-    definitions = {}
-    for _, schema in models.items():
-        if 'definitions' in schema:
-            for key, value in schema['definitions'].items():
-                definitions[key] = value
-            del schema['definitions']
+            operation['responses']['304'] = {'description': 'Not Modified'}
+
+        if hasattr(func, 'limits'):
+            operation['x-request-limits'] = func.limits
+            if 'requestBody' in operation:
+                operation['requestBody']['description'] = ', '.join(f'{k}: {v}' for k, v in func.limits.items())
+            if 'maxBodyBytes' in func.limits:
+                operation['responses']['413'] = {
+                    'description': f'Request body larger than {func.limits["maxBodyBytes"]} bytes',
+                }
+
+        if getattr(func, 'mode', 'strict') == 'shadow':
+            # 影子校验模式不会拒绝请求
+            operation['x-validation-mode'] = 'shadow'
+        elif any([hasattr(func, schema) for schema in ('query', 'path', 'body', 'form')]):
+            operation['responses']['400'] = {
+                'description': 'Validation Error',
+                'content': {
+                    'application/json': {
+                        'schema': {
+                            "code": 200,
+                        }
+                    }
+                },
+            }
+        routes.setdefault(path, {})[method.lower()] = operation
+        if index is not None:
+            index[(rule.endpoint, method)] = operation_record(rule, method, func)
+
     info = {
         'title': title,
         'version': version,
@@ -141,15 +276,17 @@ def generate_openapi(title: str,
         'openapi': openapi_version,
         'info': info,
         'tags': list(tags.values()),
-        'x-tagGroups': [{"name": k, "tags": list(set(v))} for k, v in groups.items()],
+        # 去重时保持顺序，相同的输入生成完全相同的文档
+        'x-tagGroups': [{"name": k, "tags": list(dict.fromkeys(v))} for k, v in groups.items()],
         'paths': {
             **routes
         },
         'components': {
             'schemas': {
-                name: schema for name, schema in models.items()
+                # 嵌套模型的schema，被其它模型通过 $ref 引用
+                **getattr(models, 'definitions', {}),
+                **models,
             },
         },
-        'definitions': definitions
     }
     return data
@@ -0,0 +1,273 @@
+"""
+模型注册表
+
+保存模型引用和模型的schema，schema按模型缓存并在所有SiwaDoc实例之间共享，
+嵌套模型($defs)提升为 components/schemas 中的独立组件，只保存一份
+注册表返回的schema是共享的，调用方不能修改
+除了pydantic模型，也可以注册 List[Item]、Dict[str, Item]、Annotated、dataclass 等任意类型，
+这些类型通过 TypeAdapter 校验和生成schema，TypeAdapter 按类型缓存
+"""
+import functools
+import json
+import re
+import zlib
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Tuple, Type, get_args, get_origin, get_type_hints
+
+from pydantic import BaseModel, TypeAdapter
+
+from .utils import json_default
+
+__all__ = ["ModelRegistry", "model_schema", "type_adapter", "is_model", "validate", "REF_TEMPLATE"]
+
+REF_TEMPLATE = "#/components/schemas/{model}"
+
+_REF_PREFIX = REF_TEMPLATE.format(model="")
+
+_invalid_name_re = re.compile(r"[^a-zA-Z0-9._-]")
+
+MAX_NAME_LENGTH = 64
+
+
+def is_model(tp: Any) -> bool:
+    """
+    是否是pydantic模型类，List[Item] 等泛型别名不是
+    """
+    return isinstance(tp, type) and get_origin(tp) is None and issubclass(tp, BaseModel)
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_type_adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def type_adapter(tp: Any) -> TypeAdapter:
+    """
+    TypeAdapter 的构建开销很大，每个类型只创建一次
+    Annotated 中带有不可哈希的元数据时无法缓存，每次新建
+    """
+    try:
+        return _cached_type_adapter(tp)
+    except TypeError:
+        return TypeAdapter(tp)
+
+
+def validate(tp: Any, data: Any) -> Any:
+    """
+    校验数据，pydantic模型直接使用模型的校验器，其它类型使用 TypeAdapter
+    """
+    if is_model(tp):
+        return tp.model_validate(data)
+    return type_adapter(tp).validate_python(data)
+
+
+def _type_name(tp: Any) -> str:
+    """
+    List[Item] -> List_Item, Dict[str, Item] -> Dict_str_Item
+    Annotated 的约束不体现在名字中，用repr的crc32区分
+    """
+    args = get_args(tp)
+    if not args:
+        return getattr(tp, "__name__", None) or repr(tp)
+    origin = get_origin(tp)
+    if getattr(tp, "__metadata__", None) is not None:
+        # Annotated[Union[...], Field(discriminator="type", title="Event")] 使用title作为组件名
+        title = next((m.title for m in tp.__metadata__ if getattr(m, "title", None)), None)
+        if title:
+            return title
+        return f"{_type_name(args[0])}_{zlib.crc32(repr(tp).encode()):08x}"
+    origin_name = getattr(tp, "_name", None) or getattr(origin, "__name__", None) or repr(origin)
+    return "_".join([origin_name.capitalize() if origin_name.islower() else origin_name]
+                    + [_type_name(arg) for arg in args])
+
+
+@functools.lru_cache(maxsize=None)
+def model_schema(model: Any) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    生成模型(或任意类型)的schema，按模型缓存
+    :return: (schema, 嵌套模型的schema)
+    """
+    if model is BaseModel:
+        # form=BaseModel 表示form中只有文件
+        return {'title': model.__name__, 'type': 'object', 'properties': {}}, {}
+    if is_model(model):
+        schema = model.model_json_schema(ref_template=REF_TEMPLATE)
+    else:
+        schema = type_adapter(model).json_schema(ref_template=REF_TEMPLATE)
+    definitions = schema.pop("$defs", {})
+    return _const_to_enum(schema), {k: _const_to_enum(v) for k, v in definitions.items()}
+
+
+def _const_to_enum(schema: Any) -> Any:
+    """
+    openapi 3.0 不支持const，Literal["click"] 生成的 {"const": "click"} 转换成 {"enum": ["click"]}
+    """
+    if isinstance(schema, dict):
+        schema = {k: _const_to_enum(v) for k, v in schema.items()}
+        if "const" in schema and "enum" not in schema:
+            schema["enum"] = [schema.pop("const")]
+        return schema
+    if isinstance(schema, list):
+        return [_const_to_enum(item) for item in schema]
+    return schema
+
+
+def _full_name(tp: Any) -> str:
+    full_name = f"{tp.__module__}.{tp.__qualname__}" if hasattr(tp, "__qualname__") else repr(tp)
+    return _invalid_name_re.sub("_", full_name)
+
+
+def _find_nested(tp: Any, name: str, seen: set) -> Optional[type]:
+    """
+    在模型的字段类型中按类名查找嵌套的类型，用于给同名的嵌套模型生成完整路径的组件名
+    """
+    if isinstance(tp, type) and get_origin(tp) is None:
+        if tp.__name__ == name:
+            return tp
+        if tp in seen:
+            return None
+        seen.add(tp)
+        model_fields = getattr(tp, "model_fields", None)
+        if model_fields is not None:
+            annotations = [field.annotation for field in model_fields.values()]
+        else:
+            try:
+                annotations = list(get_type_hints(tp).values()) if tp.__module__ != "builtins" else []
+            except Exception:
+                annotations = []
+    else:
+        annotations = get_args(tp)
+    for annotation in annotations:
+        found = _find_nested(annotation, name, seen)
+        if found is not None:
+            return found
+    return None
+
+
+def _rewrite_refs(schema: Any, renames: Mapping[str, str]) -> Any:
+    """
+    返回新的schema，$ref 中的组件名按 renames 替换
+    """
+    if isinstance(schema, dict):
+        schema = {k: _rewrite_refs(v, renames) for k, v in schema.items()}
+        ref = schema.get("$ref")
+        if isinstance(ref, str) and ref.startswith(_REF_PREFIX) and ref[len(_REF_PREFIX):] in renames:
+            schema["$ref"] = REF_TEMPLATE.format(model=renames[ref[len(_REF_PREFIX):]])
+        return schema
+    if isinstance(schema, list):
+        return [_rewrite_refs(item, renames) for item in schema]
+    return schema
+
+
+def _files_schema(schema: Dict[str, Any], files: Dict[str, Dict]) -> Dict[str, Any]:
+    """
+    将files中定义的字段填充到form的schema中，返回新的schema，原schema保持不变
+    """
+    properties = dict(schema.get("properties", {}))
+    required = list(schema.get("required", []))
+    for field, conf in files.items():
+        if conf.get('single', True):
+            properties[field] = {'title': field, 'type': 'string', 'format': 'binary'}
+        else:
+            properties[field] = {'title': field, 'type': 'array', 'items': {'type': 'string', 'format': 'binary'}}
+        if conf.get('required', False) and field not in required:
+            required.append(field)
+    schema = {**schema, 'properties': properties}
+    if required:
+        schema['required'] = required
+    return schema
+
+
+class ModelRegistry(Mapping):
+    """
+    组件名到schema的映射，同时记录组件名对应的模型
+    """
+
+    def __init__(self):
+        self._schemas: Dict[str, Dict[str, Any]] = {}
+        self._models: Dict[str, Type[BaseModel]] = {}
+        self._definitions: Dict[str, Dict[str, Any]] = {}
+
+    def _name(self, model: Any) -> str:
+        name = _invalid_name_re.sub("_", _type_name(model))
+        if len(name) > MAX_NAME_LENGTH:
+            # 几十个成员的Union生成的名字过长
+            name = f"{name[:MAX_NAME_LENGTH - 9]}_{zlib.crc32(name.encode()):08x}"
+        registered = self._models.get(name)
+        if registered == model:
+            return name
+        if registered is None:
+            # 和其它模型中嵌套的同名模型也要区分
+            nested = self._definitions.get(name)
+            if nested is None or nested == model_schema(model)[0]:
+                return name
+        # 不同模块中的同名模型，用完整路径区分
+        return _full_name(model)
+
+    def _hoist(self, model: Any, schema: Dict[str, Any], definitions: Dict[str, Any]):
+        """
+        嵌套模型提升为独立组件时，和已有组件同名但schema不同的改用完整路径命名，并替换相应的 $ref
+        """
+        renames: Dict[str, str] = {}
+        while True:
+            hoisted = {renames.get(k, k): _rewrite_refs(v, renames) for k, v in definitions.items()}
+            clashes = {}
+            for key, value in hoisted.items():
+                existing = self._definitions.get(key, self._schemas.get(key))
+                if existing is not None and existing != value:
+                    original = next((k for k, v in renames.items() if v == key), key)
+                    nested = _find_nested(model, original, set())
+                    if nested is not None and _full_name(nested) != key:
+                        clashes[original] = _full_name(nested)
+                    else:
+                        digest = zlib.crc32(json.dumps(definitions[original], sort_keys=True).encode())
+                        clashes[original] = f"{original}_{digest:08x}"
+            clashes = {k: v for k, v in clashes.items() if renames.get(k) != v}
+            if not clashes:
+                return _rewrite_refs(schema, renames) if renames else schema, hoisted
+            renames.update(clashes)
+
+    def register(self, model: Any, files: Optional[Dict[str, Dict]] = None) -> str:
+        """
+        注册模型，返回组件名
+        :param model: pydantic模型或者其它 TypeAdapter 支持的类型
+        :param files: form中的文件参数配置，相同配置得到相同的组件名
+        """
+        name = self._name(model)
+        schema, definitions = model_schema(model)
+        if schema.get("$ref") == REF_TEMPLATE.format(model=name) and name in definitions:
+            # 自引用的模型，schema只有指向自身的$ref
+            schema = definitions[name]
+            definitions = {k: v for k, v in definitions.items() if k != name}
+        schema, definitions = self._hoist(model, schema, definitions)
+        if files:
+            digest = zlib.crc32(json.dumps(files, sort_keys=True, default=json_default).encode())
+            name = f"{name}_{digest:08x}"
+            schema = _files_schema(schema, files)
+        self._schemas[name] = schema
+        self._models[name] = model
+        for key, value in definitions.items():
+            self._definitions.setdefault(key, value)
+        return name
+
+    def model(self, name: str) -> Any:
+        return self._models[name]
+
+    def models(self) -> Iterator[Any]:
+        return iter({id(model): model for model in self._models.values()}.values())
+
+    @property
+    def definitions(self) -> Dict[str, Dict[str, Any]]:
+        """
+        嵌套模型的schema
+        """
+        return self._definitions
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        return self._schemas[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._schemas)
+
+    def __len__(self) -> int:
+        return len(self._schemas)
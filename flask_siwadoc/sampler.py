@@ -0,0 +1,136 @@
+"""
+线上流量采样
+
+按接口限速采样校验通过的query、body和响应，每个接口只保留最近的几条，写入前按字段名脱敏，
+采样的数据可以作为 examples 合并到文档中，保持文档示例和真实数据一致
+没有被采中的请求只需要一次时间比较，不会序列化任何数据
+"""
+import copy
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import pydantic_core
+
+__all__ = ["TrafficSampler", "DEFAULT_REDACT_FIELDS"]
+
+DEFAULT_REDACT_FIELDS = ("password", "passwd", "secret", "token", "access_token", "refresh_token",
+                         "authorization", "api_key", "apikey", "cookie")
+
+Key = Tuple[str, str]
+
+
+class TrafficSampler:
+    """
+    :param rate: 每个接口每秒最多采样的请求数
+    :param size: 每个接口保留的样本数，超过时丢弃最早的样本
+    :param redact: 需要脱敏的字段名，不区分大小写，任意嵌套层级都生效
+    :param placeholder: 脱敏后的值
+    """
+
+    def __init__(self,
+                 rate: float = 1.0,
+                 size: int = 3,
+                 redact: Iterable[str] = DEFAULT_REDACT_FIELDS,
+                 placeholder: str = "***"):
+        self.interval = 1.0 / rate
+        self.size = size
+        self.redact_fields = frozenset(name.lower() for name in redact)
+        self.placeholder = placeholder
+        self._samples: Dict[Key, Deque[Dict[str, Any]]] = {}
+        self._last: Dict[Key, float] = {}
+        self._lock = threading.Lock()
+        # 每次记录样本后加一，用于判断合并了样本的文档是否需要重新生成
+        self.version = 0
+
+    def should_sample(self, key: Key) -> bool:
+        """
+        是否采样当前请求，同一个接口两次采样的间隔不小于 1/rate 秒
+        """
+        now = time.monotonic()
+        if now - self._last.get(key, float("-inf")) < self.interval:
+            return False
+        with self._lock:
+            if now - self._last.get(key, float("-inf")) < self.interval:
+                return False
+            self._last[key] = now
+        return True
+
+    def redact(self, data: Any) -> Any:
+        if isinstance(data, dict):
+            return {k: self.placeholder if str(k).lower() in self.redact_fields else self.redact(v)
+                    for k, v in data.items()}
+        if isinstance(data, list):
+            return [self.redact(item) for item in data]
+        return data
+
+    def record(self, key: Key, **sample: Any) -> None:
+        """
+        记录一条样本
+        :param key: (endpoint, method)
+        :param sample: query、body、response 等，值为pydantic模型或者可以转换成json的数据
+        """
+        sample = {name: self.redact(pydantic_core.to_jsonable_python(value))
+                  for name, value in sample.items() if value is not None}
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.size)
+            samples.append(sample)
+            self.version += 1
+
+    def samples(self, key: Key) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._samples.get(key, ()))
+
+    def merge(self, spec: Mapping[str, Any], index: Mapping[Key, Any]) -> Dict[str, Any]:
+        """
+        将样本作为 examples 合并到文档中，返回新的文档，原文档保持不变
+        :param spec: SiwaDoc.openapi
+        :param index: SiwaDoc.operation_index
+        """
+        spec = copy.deepcopy(spec)
+        for key, operation in index.items():
+            samples = self.samples(key)
+            if not samples:
+                continue
+            op = spec["paths"][operation.path][operation.method.lower()]
+            _merge_operation(op, samples)
+        return spec
+
+
+def _examples(values: List[Any]) -> Dict[str, Dict[str, Any]]:
+    return {f"sample{i + 1}": {"value": value} for i, value in enumerate(values)}
+
+
+def _merge_operation(op: Dict[str, Any], samples: List[Dict[str, Any]]) -> None:
+    # 最新的样本排在前面
+    samples = samples[::-1]
+    bodies = [s["body"] for s in samples if "body" in s]
+    if bodies and "requestBody" in op:
+        for content in op["requestBody"]["content"].values():
+            content["examples"] = _examples(bodies)
+
+    queries = [s["query"] for s in samples if isinstance(s.get("query"), dict)]
+    for param in op.get("parameters", []):
+        if param["in"] != "query":
+            continue
+        values = [query[param["name"]] for query in queries if query.get(param["name"]) is not None]
+        if values:
+            param["examples"] = _examples(values)
+
+    responses = [s["response"] for s in samples if "response" in s]
+    if responses and "200" in op.get("responses", {}):
+        for media_type, content in op["responses"]["200"].get("content", {}).items():
+            if media_type == "application/json":
+                content["examples"] = _examples(responses)
+
+
+def sample_response(response) -> Optional[Any]:
+    """
+    从响应中取出json数据，流式响应、非json或者非200的响应不采样
+    """
+    if response.status_code != 200 or response.is_streamed or not response.is_json:
+        return None
+    return response.get_json(silent=True)
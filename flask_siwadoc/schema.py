@@ -3,8 +3,11 @@
 # check Werkzeug builtin_converters in
 # https://werkzeug.palletsprojects.com/en/0.15.x/routing/#builtin-converters
 
+import functools
 import typing as t
 
+from werkzeug import routing
+
 
 def convert_any(*args, **kwargs):
     """
@@ -167,7 +170,7 @@ class AnySchema(StringSchema):
         super().__init__(_format="enum", **kwargs)
 
 
-SCHEMAS: t.Mapping[str, t.Type[BaseSchema]] = {
+SCHEMAS: t.Dict[str, t.Callable[..., t.Union[BaseSchema, dict]]] = {
     'any': AnySchema,
     'int': IntegerSchema,
     'float': FloatSchema,
@@ -177,13 +180,59 @@ SCHEMAS: t.Mapping[str, t.Type[BaseSchema]] = {
     'default': StringSchema
 }
 
+# werkzeug内置转换器与schema的对应关系，用于推断继承自内置转换器的自定义转换器
+BUILTIN_CONVERTERS: t.Mapping[t.Type[routing.BaseConverter], str] = {
+    routing.AnyConverter: 'any',
+    routing.IntegerConverter: 'int',
+    routing.FloatConverter: 'float',
+    routing.UUIDConverter: 'uuid',
+    routing.PathConverter: 'path',
+    routing.UnicodeConverter: 'string',
+}
+
+
+def register_converter(converter: str, factory: t.Callable[..., t.Union[BaseSchema, dict]]) -> None:
+    """
+    注册自定义转换器的schema工厂
+    :param converter: str: 转换器名称，与 app.url_map.converters 中的key一致
+    :param factory: 接收转换器参数，返回 BaseSchema 实例或者 schema dict
+    """
+    SCHEMAS[converter] = factory
+    _converter_schema.cache_clear()
+
 
-def get_converter(converter: str, *args, **kwargs):
+def infer_converter(converter: str, converter_class: t.Type[routing.BaseConverter]) -> bool:
     """
-    Get conveter method from converter map
+    自定义转换器继承自werkzeug内置转换器时，沿用父类对应的schema
+    :param converter: str: 转换器名称
+    :param converter_class: 转换器类
+    :return: 是否注册成功
+    """
+    if converter in SCHEMAS:
+        return False
+    for klass in converter_class.__mro__:
+        if klass in BUILTIN_CONVERTERS:
+            register_converter(converter, SCHEMAS[BUILTIN_CONVERTERS[klass]])
+            return True
+    return False
+
+
+@functools.lru_cache(maxsize=None)
+def _converter_schema(converter: str, args: tuple, kwargs: tuple) -> t.Mapping[str, t.Any]:
+    factory = SCHEMAS.get(converter, SCHEMAS['default'])
+    result = factory(*args, **dict(kwargs))
+    if isinstance(result, BaseSchema):
+        result = result.schema_json()
+    return result
+
+
+def get_converter(converter: str, *args, **kwargs) -> t.Mapping[str, t.Any]:
+    """
+    Get conveter schema from converter map, memoized by (converter, args)
+    未注册的转换器按字符串处理
     :param converter: str: converter type
     :param args:
     :param kwargs:
-    :return: return schema dict
+    :return: return schema dict, shared between callers and must not be modified
     """
-    return SCHEMAS[converter](*args, **kwargs)
+    return _converter_schema(converter, args, tuple(sorted(kwargs.items())))
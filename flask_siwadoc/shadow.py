@@ -0,0 +1,107 @@
+"""
+影子校验模式
+
+doc(mode="shadow") 的接口不拒绝请求，也不注入参数，视图函数立即执行，
+请求的原始数据交给后台线程池校验，校验失败时记录日志并计数，用于在线上评估开启严格校验的影响
+队列满时直接丢弃，不阻塞请求
+"""
+import json
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+from pydantic import BaseModel, ValidationError as PydanticError
+from werkzeug.datastructures import MultiDict
+
+from . import utils
+from .registry import is_model, validate
+from .worker import QueueWorker
+
+__all__ = ["ShadowValidator", "validate_request"]
+
+logger = logging.getLogger("flask_siwadoc.shadow")
+
+
+def validate_request(query_model: Any = None,
+                     path_model: Any = None,
+                     body_model: Any = None,
+                     form_model: Any = None,
+                     args: Optional[MultiDict] = None,
+                     view_args: Optional[Dict[str, Any]] = None,
+                     body: Optional[bytes] = None,
+                     form: Optional[MultiDict] = None) -> None:
+    """
+    按严格模式的规则校验请求的原始数据
+    :raise pydantic.ValidationError: 校验失败
+    """
+    if query_model:
+        validate(query_model, utils.convert_query_params(args or MultiDict(), query_model))
+    if path_model:
+        path_model.model_validate(view_args or {})
+    if body_model is not None:
+        try:
+            json_data = json.loads(body) if body else None
+        except ValueError:
+            json_data = None
+        if json_data is None and is_model(body_model):
+            json_data = {}
+        validate(body_model, json_data)
+    # form=BaseModel 表示form中只有文件
+    if form_model and form_model is not BaseModel:
+        form_model(**utils.convert_form_params(form or MultiDict(), form_model))
+
+
+class ShadowValidator(QueueWorker):
+    """
+    后台校验线程池，线程在第一次提交任务时启动
+    :param workers: 校验线程数
+    :param maxsize: 队列长度，队列满时丢弃任务
+    """
+
+    def __init__(self, workers: int = 2, maxsize: int = 1000):
+        super().__init__(workers, maxsize, "siwadoc-shadow")
+        self.submitted = 0
+        self.validated = 0
+        self.dropped = 0
+        self.mismatches: Counter = Counter()
+
+    def submit(self, endpoint: str, task: Callable[[], None]) -> bool:
+        """
+        提交校验任务，队列满时丢弃并返回False
+        :param endpoint: 用于统计和日志的接口名
+        :param task: 校验函数，校验失败时抛出 pydantic.ValidationError
+        """
+        accepted = self._put((endpoint, task))
+        with self._lock:
+            if accepted:
+                self.submitted += 1
+            else:
+                self.dropped += 1
+        return accepted
+
+    def _run(self):
+        while True:
+            endpoint, task = self._queue.get()
+            try:
+                task()
+            except PydanticError as e:
+                with self._lock:
+                    self.mismatches[endpoint] += 1
+                logger.warning("shadow validation failed for %s: %s", endpoint,
+                               e.errors(include_url=False, include_context=False, include_input=False))
+            except Exception:
+                logger.exception("shadow validation error for %s", endpoint)
+            finally:
+                with self._lock:
+                    self.validated += 1
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "validated": self.validated,
+                "dropped": self.dropped,
+                "mismatches": sum(self.mismatches.values()),
+                "endpoints": dict(self.mismatches),
+            }
@@ -0,0 +1,125 @@
+"""
+文档页面和openapi.json的路由
+
+只在设置了 doc_url 或 openapi_url 时导入，文档页面的Basic认证(flask_httpauth、werkzeug.security)
+在配置了 SIWA_USER、SIWA_PASSWORD 并第一次访问文档页面时才导入
+"""
+import os
+from typing import Optional
+
+from flask import Blueprint, Flask, Response, abort, render_template, request
+
+from . import SUPPORTED_UI, fingerprinted_url
+
+users = dict()
+_auth = None
+_credentials = None
+
+
+def get_auth():
+    """
+    文档页面使用的 HTTPBasicAuth，第一次使用时创建
+    """
+    global _auth
+    if _auth is None:
+        from flask_httpauth import HTTPBasicAuth
+        from werkzeug.security import check_password_hash
+
+        auth = HTTPBasicAuth()
+
+        @auth.verify_password
+        def verify_password(username, password):
+            if username in users and \
+                    check_password_hash(users.get(username), password):
+                return username
+
+        _auth = auth
+    return _auth
+
+
+def check_auth(app: Flask) -> Optional[Response]:
+    """
+    配置了 SIWA_USER、SIWA_PASSWORD 时校验Basic认证，失败时返回401/403响应
+    """
+    global users, _credentials
+    siwa_user = app.config.get("SIWA_USER")
+    siwa_pass = app.config.get("SIWA_PASSWORD")
+    if not (siwa_user and siwa_pass):
+        return None
+    if _credentials != (siwa_user, siwa_pass):
+        from werkzeug.security import generate_password_hash
+
+        # 密码哈希的计算开销很大，配置不变时只计算一次
+        users = {
+            siwa_user: generate_password_hash(siwa_pass),
+        }
+        _credentials = (siwa_user, siwa_pass)
+    auth = get_auth()
+    login_info = auth.get_auth()
+    password = auth.get_auth_password(login_info)
+    status = None
+    user = auth.authenticate(login_info, password)
+    if user in (False, None):
+        status = 401
+    elif not auth.authorize(None, user, auth):
+        status = 403
+    if status:
+        try:
+            return auth.auth_error_callback(status)
+        except TypeError:
+            return auth.auth_error_callback()
+    return None
+
+
+def register_doc_blueprint(siwa, url_prefix: Optional[str] = None):
+    """
+    注册文档蓝图
+    :param siwa: SiwaDoc实例
+    :param url_prefix: 绑定到蓝图时，文档地址位于蓝图的url_prefix下
+    """
+    template_folder = os.path.join(os.path.dirname(__file__), "templates")
+    bp_name = "siwadoc" if siwa.blueprint_name is None else f"siwadoc_{siwa.blueprint_name.replace('.', '_')}"
+    siwa_bp = Blueprint(bp_name,
+                        __name__,
+                        template_folder=template_folder,
+                        )
+
+    # 没有openapi_url时文档页面无法加载文档，不注册
+    if siwa.doc_url and siwa.openapi_url:
+        @siwa_bp.route(siwa.doc_url)
+        def doc_html():
+            error_response = check_auth(siwa.app)
+            if error_response is not None:
+                return error_response
+            ui = request.args.get("ui") or siwa.ui
+            assert ui in SUPPORTED_UI, f"ui only support with {SUPPORTED_UI}"
+            ui_file = f'{ui}.html'
+            # 带采样示例的文档会变化，不能使用带指纹的地址
+            spec_url = siwa.openapi_url if siwa.sampler is not None else siwa.fingerprinted_openapi_url
+            return render_template(ui_file, spec_url=(url_prefix or "").rstrip("/") + spec_url)
+
+    if siwa.openapi_url:
+        @siwa_bp.route(f'{siwa.openapi_url}')
+        def doc_json():
+            if siwa.sampler is not None:
+                return Response(siwa.examples_openapi_json(), mimetype="application/json")
+            return Response(siwa.openapi_json, mimetype="application/json")
+
+        @siwa_bp.route(fingerprinted_url(siwa.openapi_url, "<fingerprint>"))
+        def fingerprinted_doc_json(fingerprint):
+            if fingerprint != siwa.fingerprint:
+                abort(404)
+            response = Response(siwa.openapi_json, mimetype="application/json")
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+            response.set_etag(fingerprint)
+            return response.make_conditional(request)
+
+    if siwa.batch_url:
+        @siwa_bp.post(siwa.batch_url)
+        def batch():
+            from .batch import dispatch_batch
+            calls = request.get_json(force=True, silent=True)
+            results = dispatch_batch(siwa, calls, siwa.batch_executor)
+            return siwa.app.json.response(results)
+
+    siwa.app.register_blueprint(siwa_bp, url_prefix=url_prefix)
@@ -0,0 +1,218 @@
+"""
+上传文件的后处理
+
+files 配置中除了 required、single，还可以声明对每个文件执行的检查：
+    checksum: 计算摘要，True 表示 sha256，也可以是 hashlib 支持的其它算法名
+    sniff_type: 根据文件头的magic bytes识别文件类型，与客户端声明的 Content-Type 无关
+    checks: 自定义检查函数的列表，参数为 FileStorage，返回值作为检查结果，抛出 ValueError 表示校验失败，
+            例如 image_size、max_image_size(1920, 1080)
+每个文件只按块读取一次，摘要和类型识别共用读取的数据，多个文件在共享的线程池中并发处理，
+结果保存在注入的 files 中每个文件的 checks 属性，例如 files["avatar"].checks["checksum"]
+"""
+import hashlib
+import struct
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from pydantic import ValidationError as PydanticError
+from werkzeug.datastructures import FileStorage
+
+__all__ = ["sniff_type", "image_size", "max_image_size", "has_checks", "check_files_conf", "process_files"]
+
+CHUNK_SIZE = 64 * 1024
+
+# (偏移, magic bytes, 类型)
+_SIGNATURES: Tuple[Tuple[int, bytes, str], ...] = (
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"BM", "image/bmp"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (0, b"\x1f\x8b", "application/gzip"),
+    (0, b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"fLaC", "audio/flac"),
+    (0, b"ID3", "audio/mpeg"),
+    (4, b"ftyp", "video/mp4"),
+)
+
+
+def sniff_type(head: bytes) -> Optional[str]:
+    """
+    根据文件头识别文件类型，无法识别时返回None
+    :param head: 文件开头的若干字节
+    """
+    if head[:4] == b"RIFF" and head[8:12] in (b"WEBP", b"WAVE", b"AVI "):
+        return {b"WEBP": "image/webp", b"WAVE": "audio/wav", b"AVI ": "video/x-msvideo"}[head[8:12]]
+    for offset, magic, content_type in _SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return content_type
+    return None
+
+
+def _jpeg_size(stream) -> Optional[Tuple[int, int]]:
+    stream.seek(2)
+    while True:
+        marker = stream.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length = stream.read(2)
+        if len(length) < 2:
+            return None
+        # SOF0-SOF15，不包括 DHT、JPG、DAC
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            data = stream.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">HH", data[1:5])
+            return width, height
+        stream.seek(struct.unpack(">H", length)[0] - 2, 1)
+
+
+def image_size(file: FileStorage) -> Tuple[int, int]:
+    """
+    从文件头读取图片的宽高，支持png、jpeg、gif、bmp、webp，只读取必要的字节
+    :raise ValueError: 不是支持的图片
+    """
+    stream = file.stream
+    head = stream.read(32)
+    size = None
+    if head[:8] == b"\x89PNG\r\n\x1a\n" and len(head) >= 24:
+        size = struct.unpack(">II", head[16:24])
+    elif head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+        size = struct.unpack("<HH", head[6:10])
+    elif head[:2] == b"BM" and len(head) >= 26:
+        width, height = struct.unpack("<ii", head[18:26])
+        size = (width, abs(height))
+    elif head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", head[26:30])
+            size = (width & 0x3FFF, height & 0x3FFF)
+        elif chunk == b"VP8L":
+            bits = int.from_bytes(head[21:25], "little")
+            size = ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+        elif chunk == b"VP8X":
+            size = (int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1)
+    elif head[:3] == b"\xff\xd8\xff":
+        size = _jpeg_size(stream)
+    stream.seek(0)
+    if size is None:
+        raise ValueError("file is not a supported image")
+    return tuple(size)
+
+
+def max_image_size(max_width: int, max_height: int) -> Callable[[FileStorage], Tuple[int, int]]:
+    """
+    限制图片宽高的检查，结果与 image_size 相同
+    """
+
+    def check(file: FileStorage) -> Tuple[int, int]:
+        width, height = image_size(file)
+        if width > max_width or height > max_height:
+            raise ValueError(f"image size {width}x{height} exceeds {max_width}x{max_height}")
+        return width, height
+
+    check.__name__ = "image_size"
+    return check
+
+
+def has_checks(conf: Mapping[str, Any]) -> bool:
+    return bool(conf.get("checksum") or conf.get("sniff_type") or conf.get("checks"))
+
+
+def _new_digest(checksum: Any):
+    return hashlib.new("sha256" if checksum is True else checksum)
+
+
+def check_files_conf(files_conf: Mapping[str, Mapping[str, Any]]) -> None:
+    """
+    在装饰时检查 files 配置，避免配置错误在请求时变成400
+    :raise ValueError: 摘要算法不存在或者自定义检查不可调用
+    """
+    for field, conf in files_conf.items():
+        checksum = conf.get("checksum")
+        if checksum:
+            try:
+                _new_digest(checksum)
+            except (TypeError, ValueError):
+                raise ValueError(f"unsupported checksum algorithm {checksum!r} for file {field!r}") from None
+        for check in conf.get("checks") or ():
+            if not callable(check):
+                raise ValueError(f"check {check!r} for file {field!r} is not callable")
+
+
+def _process(file: FileStorage, conf: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    按块读取一次文件，计算摘要和识别类型，再依次执行自定义检查，最后把文件指针移回开头
+    """
+    checksum = conf.get("checksum")
+    digest = _new_digest(checksum) if checksum else None
+    results: Dict[str, Any] = {}
+    stream = file.stream
+    if digest is not None or conf.get("sniff_type"):
+        head = b""
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if len(head) < 16:
+                head += chunk[:16]
+            if digest is None:
+                # 只需要识别类型
+                break
+            digest.update(chunk)
+        stream.seek(0)
+        if digest is not None:
+            results["checksum"] = digest.hexdigest()
+        if conf.get("sniff_type"):
+            results["content_type"] = sniff_type(head)
+    for check in conf.get("checks") or ():
+        try:
+            results[getattr(check, "__name__", repr(check))] = check(file)
+        finally:
+            stream.seek(0)
+    return results
+
+
+def _run(field: str, file: FileStorage, conf: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    :return: 检查失败时返回pydantic错误，否则把结果保存到 file.checks
+    """
+    try:
+        file.checks = _process(file, conf)
+    except ValueError as e:
+        return {"type": "value_error", "loc": (field,), "input": file.filename, "ctx": {"error": e}}
+    return None
+
+
+def process_files(files_data: Mapping[str, Any],
+                  files_conf: Mapping[str, Mapping[str, Any]],
+                  executor: Optional[Executor] = None) -> None:
+    """
+    对上传的文件执行 files 配置中声明的检查
+    :param files_data: 字段名到 FileStorage(或者FileStorage列表)的映射
+    :param files_conf: doc装饰器的files参数
+    :param executor: 传入线程池时多个文件并发处理
+    :raise pydantic.ValidationError: 自定义检查抛出 ValueError
+    """
+    tasks: List[Tuple[str, FileStorage, Mapping[str, Any]]] = []
+    for field, value in files_data.items():
+        conf = files_conf.get(field) or {}
+        if not has_checks(conf):
+            continue
+        for file in value if isinstance(value, list) else [value]:
+            tasks.append((field, file, conf))
+    if executor is None or len(tasks) < 2:
+        errors = [_run(*task) for task in tasks]
+    else:
+        errors = list(executor.map(lambda task: _run(*task), tasks))
+    errors = [error for error in errors if error is not None]
+    if errors:
+        raise PydanticError.from_exception_data("files", errors)
@@ -1,10 +1,12 @@
+import functools
 import inspect
 import re
-from typing import Mapping, get_args, Type, Any, get_origin, Union, List, Set
+from typing import Mapping, get_args, Type, Any, get_origin, get_type_hints, Iterable, Union, List, Set, Tuple, FrozenSet
 
 from pydantic import BaseModel
 from typing import Literal
 from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import BadRequest
 
 from . import schema
 
@@ -36,15 +38,15 @@ def convert_query_params(query_prams: MultiDict, model: Type[BaseModel]) -> dict
     修复兼容 Pydantic V2 的版本。
     """
 
-    # 1. 获取所有字段的元数据
-    model_fields = model.model_fields
+    # 1. 获取所有列表/集合字段
+    multi_fields = list_fields(model)
 
     # 2. 从 flat=False 中获取所有列表/集合字段的值
     # 这些字段在 MultiDict 中有多个值，应该以列表形式传递给 Pydantic
-    list_fields = {
+    list_fields_ = {
         key: value
         for key, value in query_prams.to_dict(flat=False).items()
-        if key in model_fields and is_list_or_set_annotation(model_fields[key].annotation)
+        if key in multi_fields
     }
 
     # 3. 从 flat=True 中获取所有简单字段的值
@@ -57,10 +59,195 @@ def convert_query_params(query_prams: MultiDict, model: Type[BaseModel]) -> dict
 
     return {
         **simple_fields,
-        **list_fields
+        **list_fields_
     }
 
 
+@functools.lru_cache(maxsize=None)
+def list_fields(model: Type[Any]) -> FrozenSet[str]:
+    """
+    模型中类型为列表/集合的字段名，按模型缓存
+    除了pydantic模型，也支持dataclass、TypedDict等带类型注解的类
+    """
+    model_fields = getattr(model, "model_fields", None)
+    if model_fields is not None:
+        annotations = {name: field.annotation for name, field in model_fields.items()}
+    else:
+        try:
+            annotations = get_type_hints(model)
+        except TypeError:
+            annotations = {}
+    return frozenset(name for name, annotation in annotations.items() if is_list_or_set_annotation(annotation))
+
+
+@functools.lru_cache(maxsize=None)
+def form_index(model: Type[Any]) -> Mapping[str, Tuple[bool, Any]]:
+    """
+    form字段索引，按模型缓存：字段名(和别名) -> (是否为列表字段, 嵌套的模型)
+    嵌套模型的索引在用到时再生成，支持自引用的模型
+    """
+    model_fields = getattr(model, "model_fields", None)
+    if model_fields is not None:
+        annotations = {name: field.annotation for name, field in model_fields.items()}
+        aliases = {name: field.alias for name, field in model_fields.items() if field.alias}
+    else:
+        try:
+            annotations = get_type_hints(model)
+        except TypeError:
+            annotations = {}
+        aliases = {}
+    multi_fields = list_fields(model)
+    index = {}
+    for name, annotation in annotations.items():
+        entry = (name in multi_fields, _nested_model(annotation))
+        index[name] = entry
+        if name in aliases:
+            index[aliases[name]] = entry
+    return index
+
+
+def _nested_model(annotation: Any) -> Any:
+    """
+    字段类型中的嵌套模型，List[Item]、Optional[Item] 返回 Item，不是模型时返回None
+    """
+    if isinstance(annotation, type):
+        return annotation if hasattr(annotation, "model_fields") else None
+    for arg in get_args(annotation):
+        model = _nested_model(arg)
+        if model is not None:
+            return model
+    return None
+
+
+_form_key_re = re.compile(r'\.?([^\[\].]+)|\[(\d*)\]')
+
+
+class _Indexed(dict):
+    """
+    items[0]、items[] 生成的列表，按下标保存，转换完成后按下标排序成列表
+    """
+
+
+def _form_path(key: str) -> List[Union[str, int, None]]:
+    """
+    items[0].name -> ["items", 0, "name"]，items[] -> ["items", None]
+    """
+    path = []
+    pos = 0
+    if key.startswith("."):
+        return [key]
+    for match in _form_key_re.finditer(key):
+        if match.start() != pos:
+            break
+        name, index = match.groups()
+        if name is not None:
+            path.append(name)
+        else:
+            path.append(int(index) if index else None)
+        pos = match.end()
+    if pos != len(key) or not path or not isinstance(path[0], str):
+        return [key]
+    return path
+
+
+def _finalize(value: Any) -> Any:
+    if isinstance(value, _Indexed):
+        return [_finalize(value[k]) for k in sorted(value)]
+    if isinstance(value, dict):
+        return {k: _finalize(v) for k, v in value.items()}
+    return value
+
+
+def convert_form_params(form: MultiDict, model: Type[Any]) -> dict:
+    """
+    将form转换成模型的输入，只遍历一次form
+    列表字段取所有值(getlist)，其它字段取第一个值；
+    items[0].name、user.name、tags[] 形式的字段名解析成嵌套的对象和列表
+    :param form: flask request.form
+    :param model: form的模型
+    """
+    index = form_index(model)
+    data = {}
+    nested = False
+    for key, values in form.lists():
+        entry = index.get(key)
+        if entry is not None or ("[" not in key and "." not in key):
+            data[key] = values if entry is not None and entry[0] else values[0]
+            continue
+        path = _form_path(key)
+        if len(path) == 1:
+            data[key] = values[0]
+            continue
+        nested = True
+        container: Any = data
+        field_index: Any = index
+        many = False
+        for i, part in enumerate(path):
+            last = i == len(path) - 1
+            if isinstance(part, str):
+                if not isinstance(container, dict) or isinstance(container, _Indexed):
+                    raise BadRequest(f"conflicting form field {key}")
+                entry = field_index.get(part) if field_index is not None else None
+                many = entry is not None and entry[0]
+                field_index = form_index(entry[1]) if entry is not None and entry[1] is not None else None
+            else:
+                if not isinstance(container, _Indexed):
+                    raise BadRequest(f"conflicting form field {key}")
+                # items[] 追加到末尾
+                part = len(container) if part is None else part
+                many = False
+            if last:
+                if path[-1] is None:
+                    # tags[]=a&tags[]=b，每个值都是一个元素
+                    for value in values:
+                        container[len(container)] = value
+                else:
+                    container[part] = values if many else values[0]
+                break
+            child = container.get(part)
+            if child is None:
+                child = container[part] = _Indexed() if not isinstance(path[i + 1], str) else {}
+            container = child
+    return _finalize(data) if nested else data
+
+
+_json_token_re = re.compile(rb'"(?:[^"\\]|\\.)*"|[\[\]{},]')
+
+
+def json_default(obj: Any) -> str:
+    """
+    json.dumps 的default，用于计算指纹和摘要，函数的repr包含内存地址，每个进程都不同，使用完整路径
+    """
+    if callable(obj) and hasattr(obj, '__qualname__'):
+        return f"{getattr(obj, '__module__', '')}.{obj.__qualname__}"
+    return str(obj)
+
+
+def check_json_limits(data: bytes, max_depth: int = None, max_items: int = None) -> None:
+    """
+    解析json之前检查嵌套深度和数组(对象)的元素个数，只扫描括号和逗号，跳过字符串
+    :param data: 请求体
+    :param max_depth: 最大嵌套深度
+    :param max_items: 单个数组或对象的最大元素个数
+    :raise BadRequest: 超过限制
+    """
+    # 每一层已经出现的逗号个数
+    commas = []
+    for match in _json_token_re.finditer(data):
+        token = match.group()
+        if token in (b"[", b"{"):
+            commas.append(0)
+            if max_depth is not None and len(commas) > max_depth:
+                raise BadRequest(f"JSON nesting exceeds the maximum depth of {max_depth}")
+        elif token in (b"]", b"}"):
+            if commas:
+                commas.pop()
+        elif token == b"," and commas:
+            commas[-1] += 1
+            if max_items is not None and commas[-1] >= max_items:
+                raise BadRequest(f"JSON array or object exceeds the maximum of {max_items} items")
+
+
 def parse_path_params(route: str) -> (str, List):
     """
     解析路径参数
@@ -78,8 +265,27 @@ def parse_path_params(route: str) -> (str, List):
                         }
                 }],
     """
-    subs = []
+    path, variables = parse_route(route)
     parameters = []
+    for converter, args, kwargs, variable in variables:
+        parameters.append({
+            'name': variable,
+            'in': 'path',
+            'required': True,
+            'schema': dict(get_path_param_schema(converter, *args, **dict(kwargs))),
+        })
+    return path, parameters
+
+
+@functools.lru_cache(maxsize=None)
+def parse_route(route: str) -> Tuple[str, Tuple[Tuple[str, tuple, tuple, str], ...]]:
+    """
+    解析路由字符串，结果按路由缓存，相同的路由只解析一次
+    :param route: /hello/<int(min=2):age>
+    :return: ('/hello/{age}', (('int', (), (('min', 2),), 'age'),))
+    """
+    subs = []
+    variables = []
 
     # /hello/<int(min=2):age>
     # 会转成两个元素
@@ -91,29 +297,25 @@ def parse_path_params(route: str) -> (str, List):
             continue
         subs.append(f'{{{variable}}}')
 
-        args, kwargs = [], {}
+        args, kwargs = (), {}
 
         if arguments:
             args, kwargs = parse_converter_args(arguments)
 
-        path_param_schema = get_path_param_schema(converter, *args, **kwargs).schema_json()
-
-        parameters.append({
-            'name': variable,
-            'in': 'path',
-            'required': True,
-            'schema': path_param_schema,
-        })
-    path = ''.join(subs)
-    return path, parameters
+        variables.append((converter, tuple(args), tuple(sorted(kwargs.items())), variable))
+    return ''.join(subs), tuple(variables)
 
 
 def parse_other_params(
         location: Literal["query", "header", "cookie"],
         model: Mapping[str, Any],
 ) -> List[Mapping[str, Any]]:
+    if location == "query" and "properties" not in model and model.get("type") == "object":
+        # Dict[str, int] 等没有固定字段的query，作为展开的对象参数
+        return [{"name": location, "in": location, "schema": model, "style": "form", "explode": True,
+                 "required": False, "description": model.get("description", "")}]
     params = []
-    for name, _schema in model["properties"].items():
+    for name, _schema in model.get("properties", {}).items():
         params.append(
             {
                 "name": name,
@@ -126,6 +328,37 @@ def parse_other_params(
     return params
 
 
+def check_path_model(arguments: Iterable[str], model: Type[BaseModel]) -> None:
+    """
+    path模型的必填字段都要是路由中的变量，否则每个请求都会因为缺少字段而校验失败
+    :param arguments: 路由中的变量名，rule.arguments
+    :param model: path模型
+    """
+    missing = [name for name, field in model.model_fields.items()
+               if field.is_required() and (field.alias or name) not in arguments]
+    assert not missing, f"path model {model.__name__} requires {missing}, which are not variables of the route"
+
+
+def merge_path_params(parameters: List[dict], model: Mapping[str, Any]) -> List[dict]:
+    """
+    将path模型中的字段schema合并到由路由转换器生成的路径参数中
+    转换器给出基础类型，模型补充约束（pattern、minimum、enum等），同名属性以模型为准
+    :param parameters: parse_path_params 返回的路径参数列表
+    :param model: path模型的schema
+    """
+    properties = model.get("properties", {})
+    missing = set(model.get("required", ())) - {param["name"] for param in parameters}
+    assert not missing, f"path model {model.get('title')} requires {sorted(missing)}, which are not variables of the route"
+    for param in parameters:
+        field_schema = properties.get(param["name"])
+        if field_schema is None:
+            continue
+        param["schema"] = {**param["schema"], **field_schema}
+        if field_schema.get("description"):
+            param["description"] = field_schema["description"]
+    return parameters
+
+
 def get_operation_summary(func) -> str:
     """
     return a summary for operation in the method
@@ -136,6 +369,15 @@ def get_operation_summary(func) -> str:
     return func.summary or func.__qualname__.replace(".", " ").replace("_", " ").title()
 
 
+def get_operation_id(func, method: str) -> str:
+    """
+    :param func: flask view function
+    :param method: http method
+    :return:str
+    """
+    return func.__name__ + '__' + method.lower()
+
+
 def get_operation_description(func) -> str:
     """
     :param func: flask view function
@@ -144,7 +386,7 @@ def get_operation_description(func) -> str:
     return func.description or (inspect.getdoc(func) or "").split("\f")[0]
 
 
-def get_path_param_schema(converter: str, *args, **kwargs) -> schema.BaseSchema:
+def get_path_param_schema(converter: str, *args, **kwargs) -> Mapping[str, Any]:
     """
     获取路径参数对应的schema
     将werkzeug的转换器转换成openapi所需的schema
@@ -158,10 +400,11 @@ def get_path_param_schema(converter: str, *args, **kwargs) -> schema.BaseSchema:
               "type": "string"
             }
     :param converter: str: converter type  'any'|'int'|'float'|'uuid'|'path'|'string'|'default'
+                      或者通过 schema.register_converter 注册的自定义转换器
     :param args:
     :param kwargs:
     """
-    return schema.SCHEMAS[converter](*args, **kwargs)
+    return schema.get_converter(converter, *args, **kwargs)
 
 
 _rule_re = re.compile(
@@ -0,0 +1,60 @@
+"""
+后台线程和有界队列，影子校验和校验失败日志共用
+"""
+import abc
+import os
+import queue
+import threading
+from typing import Any, List, Optional
+
+__all__ = ["QueueWorker"]
+
+
+class QueueWorker(abc.ABC):
+    """
+    线程在第一次放入队列时启动，子类实现 _run 消费 self._queue
+    :param workers: 线程数
+    :param maxsize: 队列长度，队列满时 _put 返回False，不阻塞
+    :param name: 线程名前缀
+    """
+
+    def __init__(self, workers: int, maxsize: int, name: str):
+        self.workers = workers
+        self._name = name
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize)
+        self._threads: List[threading.Thread] = []
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # fork之后线程不会被复制，在子进程中重新启动
+            self._pid = os.getpid()
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"{self._name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _put(self, item: Any) -> bool:
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            return False
+        return True
+
+    @abc.abstractmethod
+    def _run(self) -> None:
+        """
+        在后台线程中循环消费队列，每个元素处理完后调用 self._queue.task_done()
+        """
+
+    def join(self):
+        """
+        等待队列中的元素全部处理完成
+        """
+        self._queue.join()
@@ -0,0 +1,121 @@
+import pytest
+from flask import Flask, g, request
+from pydantic import BaseModel, ValidationError
+
+from flask_siwadoc import SiwaDoc
+
+
+class Query(BaseModel):
+    fields: str = ""
+
+
+class User(BaseModel):
+    name: str
+
+
+def create_app(**kwargs):
+    app = Flask(__name__)
+    siwa = SiwaDoc(app, batch_url="/batch", **kwargs)
+
+    @app.errorhandler(ValidationError)
+    def validation_error(e):
+        return {"errors": e.errors(include_url=False, include_context=False)}, 400
+
+    @app.get("/user/<int:user_id>")
+    @siwa.doc(query=Query)
+    def get_user(user_id, query: Query):
+        return {"id": user_id, "fields": query.fields, "token": request.headers.get("X-Token")}
+
+    @app.post("/user")
+    @siwa.doc(body=User)
+    def create_user(body: User):
+        return {"name": body.name}, 201, {"Location": "/user/1"}
+
+    @app.get("/counter")
+    @siwa.doc()
+    def counter():
+        g.count = g.get("count", 0) + 1
+        return {"count": g.count}
+
+    @app.get("/internal")
+    def internal():
+        return "secret"
+
+    return app, siwa
+
+
+def post_batch(app, calls, **kwargs):
+    return app.test_client().post("/batch", json=calls, **kwargs)
+
+
+def test_results_in_order():
+    app, _ = create_app()
+    r = post_batch(app, [
+        {"method": "GET", "path": "/user/1", "query": {"fields": "name"}},
+        {"method": "post", "path": "/user", "body": {"name": "siwa"}},
+        {"path": "/user/2?fields=id"},
+    ])
+    assert r.status_code == 200
+    first, second, third = r.json
+    assert first == {"status": 200, "body": {"id": 1, "fields": "name", "token": None}}
+    assert second == {"status": 201, "body": {"name": "siwa"}, "headers": {"Location": "/user/1"}}
+    assert third["body"]["fields"] == "id"
+
+
+def test_headers_are_inherited_and_overridden():
+    app, _ = create_app()
+    r = post_batch(app, [
+        {"path": "/user/1"},
+        {"path": "/user/1", "headers": {"X-Token": "b"}},
+    ], headers={"X-Token": "a"})
+    assert [item["body"]["token"] for item in r.json] == ["a", "b"]
+
+
+def test_undocumented_operations_are_not_dispatched():
+    app, _ = create_app()
+    r = post_batch(app, [
+        {"path": "/internal"},
+        {"path": "/missing"},
+        {"method": "DELETE", "path": "/user"},
+    ])
+    assert [item["status"] for item in r.json] == [404, 404, 405]
+    assert r.json[0]["body"] == {"message": "operation is not documented"}
+
+
+@pytest.mark.parametrize("call", [
+    "not an object",
+    {"path": "user/1"},
+    {"path": None},
+    {"method": 1, "path": "/user/1"},
+    {"method": "GE T", "path": "/user/1"},
+    {"path": "/user/1", "headers": ["X-Token"]},
+    {"path": "/user/1", "headers": {"X-Token": 1}},
+])
+def test_malformed_call_returns_400(call):
+    app, _ = create_app()
+    r = post_batch(app, [call, {"path": "/user/1"}])
+    assert r.status_code == 200
+    assert r.json[0]["status"] == 400
+    assert r.json[1]["status"] == 200
+
+
+def test_validation_error_per_call():
+    app, _ = create_app()
+    r = post_batch(app, [{"method": "POST", "path": "/user", "body": {}}, {"path": "/user/1"}])
+    assert r.json[0]["status"] == 400
+    assert r.json[0]["body"]["errors"][0]["loc"] == ["name"]
+    assert r.json[1]["status"] == 200
+
+
+def test_batch_must_be_array_within_limit():
+    app, _ = create_app(batch_max_calls=2)
+    assert post_batch(app, {"path": "/user/1"}).status_code == 400
+    assert post_batch(app, [{"path": "/user/1"}] * 3).status_code == 400
+
+
+@pytest.mark.parametrize("workers", [0, 4])
+def test_each_call_has_its_own_app_context(workers):
+    app, siwa = create_app(batch_workers=workers)
+    r = post_batch(app, [{"path": "/counter"}] * 5)
+    assert [item["body"] for item in r.json] == [{"count": 1}] * 5
+    assert (siwa.batch_executor is None) == (workers == 0)
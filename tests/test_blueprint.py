@@ -0,0 +1,96 @@
+from flask import Blueprint, Flask
+from pydantic import BaseModel
+
+from flask_siwadoc import SiwaDoc
+
+
+class Query(BaseModel):
+    page: int = 1
+
+
+def create_app():
+    app = Flask(__name__)
+    siwa = SiwaDoc(app, title="app")
+    v1 = Blueprint("v1", __name__, url_prefix="/v1")
+    v2 = Blueprint("v2", __name__, url_prefix="/v2")
+    siwa_v1 = SiwaDoc(v1, title="v1")
+    siwa_v2 = SiwaDoc(v2, title="v2")
+
+    @app.get("/health")
+    @siwa.doc()
+    def health():
+        return "ok"
+
+    @v1.get("/users")
+    @siwa_v1.doc(query=Query)
+    def users_v1(query: Query):
+        return {"page": query.page}
+
+    @v2.get("/users")
+    @siwa_v2.doc(query=Query)
+    def users_v2(query: Query):
+        return {"page": query.page * 2}
+
+    app.register_blueprint(v1)
+    app.register_blueprint(v2)
+    return app, siwa, siwa_v1, siwa_v2
+
+
+def test_each_instance_documents_its_own_routes():
+    app, siwa, siwa_v1, siwa_v2 = create_app()
+    assert set(siwa.openapi["paths"]) == {"/health"}
+    assert set(siwa_v1.openapi["paths"]) == {"/v1/users"}
+    assert set(siwa_v2.openapi["paths"]) == {"/v2/users"}
+    assert siwa_v1.openapi["info"]["title"] == "v1"
+
+
+def test_doc_urls_under_blueprint_prefix():
+    app, *_ = create_app()
+    client = app.test_client()
+    assert set(client.get("/openapi.json").json["paths"]) == {"/health"}
+    assert set(client.get("/v1/openapi.json").json["paths"]) == {"/v1/users"}
+    assert client.get("/v2/docs").status_code == 200
+    assert b"/v2/openapi." in client.get("/v2/docs").data
+
+
+def test_views_still_validate():
+    app, *_ = create_app()
+    client = app.test_client()
+    assert client.get("/v1/users?page=3").json == {"page": 3}
+    assert client.get("/v2/users?page=3").json == {"page": 6}
+
+
+def test_cli_uses_app_level_instance():
+    app, siwa, *_ = create_app()
+    assert app.extensions["siwadoc"] is siwa
+
+
+def test_cli_uses_first_blueprint_instance_without_app_instance():
+    app = Flask(__name__)
+    v1 = Blueprint("v1", __name__, url_prefix="/v1")
+    siwa_v1 = SiwaDoc(v1)
+    app.register_blueprint(v1)
+    assert app.extensions["siwadoc"] is siwa_v1
+
+
+def test_nested_blueprint():
+    app = Flask(__name__)
+    api = Blueprint("api", __name__, url_prefix="/api")
+    v1 = Blueprint("v1", __name__, url_prefix="/v1")
+    siwa_v1 = SiwaDoc(v1)
+
+    @v1.get("/ping")
+    @siwa_v1.doc()
+    def ping():
+        return "pong"
+
+    api.register_blueprint(v1)
+    app.register_blueprint(api)
+    assert set(siwa_v1.openapi["paths"]) == {"/api/v1/ping"}
+    assert app.test_client().get("/api/v1/openapi.json").status_code == 200
+
+
+def test_docs_page_requires_openapi_url():
+    app = Flask(__name__)
+    SiwaDoc(app, openapi_url=None)
+    assert app.test_client().get("/docs").status_code == 404
@@ -0,0 +1,183 @@
+from typing import List
+
+import pytest
+from flask import Flask, make_response
+from pydantic import BaseModel
+
+from flask_siwadoc import SiwaDoc, cache
+from flask_siwadoc.cache import CacheBackend, CachePolicy, MemoryCache
+
+
+class Query(BaseModel):
+    a: int = 0
+    b: int = 0
+
+
+class Item(BaseModel):
+    id: int
+
+
+def create_app(**kwargs):
+    app = Flask(__name__)
+    siwa = SiwaDoc(app, **kwargs)
+    calls = []
+
+    @app.get("/sum")
+    @siwa.doc(query=Query, cache=60)
+    def total(query: Query):
+        calls.append(1)
+        return {"sum": query.a + query.b}
+
+    return app, siwa, calls
+
+
+def test_query_order_hits_same_entry():
+    app, _, calls = create_app()
+    client = app.test_client()
+    assert client.get("/sum?a=1&b=2").json == {"sum": 3}
+    assert client.get("/sum?b=2&a=1").json == {"sum": 3}
+    assert client.get("/sum?a=2&b=2").json == {"sum": 4}
+    assert len(calls) == 2
+
+
+def test_etag_and_not_modified():
+    app, _, calls = create_app()
+    client = app.test_client()
+    r = client.get("/sum?a=1")
+    assert r.headers["Cache-Control"] == "public, max-age=60"
+    etag = r.headers["ETag"]
+    r = client.get("/sum?a=1", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.data == b""
+    assert len(calls) == 1
+
+
+def test_ttl_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    app, _, calls = create_app()
+    client = app.test_client()
+    client.get("/sum?a=1")
+    now[0] += 59
+    client.get("/sum?a=1")
+    assert len(calls) == 1
+    now[0] += 2
+    client.get("/sum?a=1")
+    assert len(calls) == 2
+
+
+def test_negotiated_media_type_is_part_of_key():
+    msgpack = pytest.importorskip("msgpack")
+    app, _, calls = create_app(json_provider=True)
+    client = app.test_client()
+    r = client.get("/sum?a=1&b=2", headers={"Accept": "application/msgpack"})
+    assert r.mimetype == "application/msgpack"
+    assert msgpack.unpackb(r.data) == {"sum": 3}
+    assert "Accept" in r.vary
+    r = client.get("/sum?b=2&a=1", headers={"Accept": "application/json"})
+    assert r.mimetype == "application/json"
+    assert r.json == {"sum": 3}
+    assert "Accept" in r.vary
+    assert len(calls) == 2
+
+
+def test_cookies_are_not_cached():
+    app = Flask(__name__)
+    siwa = SiwaDoc(app)
+    calls = []
+
+    @app.get("/login")
+    @siwa.doc(cache=60)
+    def login():
+        calls.append(1)
+        response = make_response({"ok": True})
+        response.set_cookie("sid", str(len(calls)))
+        return response
+
+    client = app.test_client()
+    assert client.get("/login").headers["Set-Cookie"].startswith("sid=1")
+    assert client.get("/login").headers["Set-Cookie"].startswith("sid=2")
+    assert len(calls) == 2
+
+
+def test_only_content_headers_are_replayed():
+    app = Flask(__name__)
+    siwa = SiwaDoc(app)
+
+    @app.get("/report")
+    @siwa.doc(cache=60)
+    def report():
+        return {"ok": True}, {"X-Request-Id": "first", "Content-Language": "zh"}
+
+    client = app.test_client()
+    client.get("/report")
+    r = client.get("/report")
+    assert "X-Request-Id" not in r.headers
+    assert r.headers["Content-Language"] == "zh"
+    assert r.mimetype == "application/json"
+
+
+def test_error_responses_are_not_cached():
+    app = Flask(__name__)
+    siwa = SiwaDoc(app)
+    calls = []
+
+    @app.get("/flaky")
+    @siwa.doc(cache=60)
+    def flaky():
+        calls.append(1)
+        return {"error": True}, 503
+
+    client = app.test_client()
+    client.get("/flaky")
+    client.get("/flaky")
+    assert len(calls) == 2
+
+
+def test_generator_is_materialised():
+    app = Flask(__name__)
+    siwa = SiwaDoc(app)
+
+    @app.get("/items")
+    @siwa.doc(resp=List[Item], cache=60)
+    def items():
+        return (Item(id=i) for i in range(3))
+
+    client = app.test_client()
+    for _ in range(2):
+        assert client.get("/items").json == [{"id": 0}, {"id": 1}, {"id": 2}]
+
+
+def test_policy_backend_overrides_default():
+    backend = MemoryCache()
+    app = Flask(__name__)
+    siwa = SiwaDoc(app)
+
+    @app.get("/private")
+    @siwa.doc(cache=CachePolicy(ttl=10, backend=backend, public=False))
+    def private():
+        return {"ok": True}
+
+    r = app.test_client().get("/private")
+    assert r.headers["Cache-Control"] == "private, max-age=10"
+    assert len(backend._data) == 1
+
+
+def test_memory_cache_evicts_least_recently_used():
+    backend = MemoryCache(maxsize=2)
+    entry = cache.CachedResponse(body=b"", status=200, headers=(), etag="", expires=float("inf"))
+    backend.set("a", entry, 1)
+    backend.set("b", entry, 1)
+    backend.get("a")
+    backend.set("c", entry, 1)
+    assert backend.get("b") is None
+    assert backend.get("a") is entry
+
+
+def test_backend_must_implement_interface():
+    class Incomplete(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,126 @@
+import json
+import threading
+
+import pytest
+from flask import Flask
+from pydantic import BaseModel, ValidationError
+
+from flask_siwadoc import SiwaDoc
+from flask_siwadoc.failures import FailureLogger, JsonLinesSink, Sink
+
+
+class Query(BaseModel):
+    page: int = 1
+
+
+class ListSink(Sink):
+    def __init__(self):
+        self.records = []
+
+    def write(self, records):
+        self.records.extend(records)
+
+
+class BrokenSink(Sink):
+    def write(self, records):
+        raise OSError("disk full")
+
+
+def create_app(failure_log):
+    app = Flask(__name__)
+    siwa = SiwaDoc(app, failure_log=failure_log)
+
+    @app.errorhandler(ValidationError)
+    def validation_error(e):
+        return {"errors": e.errors(include_url=False, include_context=False)}, 400
+
+    @app.get("/users")
+    @siwa.doc(query=Query)
+    def users(query: Query):
+        return {"page": query.page}
+
+    return app
+
+
+def test_failures_are_recorded():
+    sink = ListSink()
+    failure_log = FailureLogger(sink, max_input=8)
+    client = create_app(failure_log).test_client()
+    assert client.get("/users?page=2").status_code == 200
+    r = client.get("/users?page=x&padding=0123456789", headers={"X-Forwarded-For": "1.2.3.4, 10.0.0.1"})
+    assert r.status_code == 400
+    failure_log.join()
+    record, = sink.records
+    assert record["operation"] == "users__get"
+    assert record["method"] == "GET"
+    assert record["path"] == "/users"
+    assert record["location"] == "query"
+    assert record["errors"] == [{"loc": ["page"], "type": "int_parsing"}]
+    assert record["client"] == "1.2.3.4"
+    assert record["input"] == "page=x&p"
+    assert failure_log.stats()["logged"] == 1
+
+
+def test_rate_limit_per_operation(monkeypatch):
+    sink = ListSink()
+    failure_log = FailureLogger(sink, rate=2)
+    now = [1000.0]
+    monkeypatch.setattr("flask_siwadoc.failures.time.monotonic", lambda: now[0])
+    client = create_app(failure_log).test_client()
+    for _ in range(5):
+        client.get("/users?page=x")
+    now[0] += 1
+    client.get("/users?page=x")
+    failure_log.join()
+    stats = failure_log.stats()
+    assert stats["logged"] == 3
+    assert stats["dropped_rate"] == 3
+    assert stats["dropped_by_operation"] == {"users__get": 3}
+
+
+def test_full_queue_drops_records():
+    started, release = threading.Event(), threading.Event()
+
+    class SlowSink(ListSink):
+        def write(self, records):
+            started.set()
+            release.wait(5)
+            super().write(records)
+
+    sink = SlowSink()
+    failure_log = FailureLogger(sink, maxsize=1, rate=100)
+    client = create_app(failure_log).test_client()
+    client.get("/users?page=x")
+    assert started.wait(5)
+    client.get("/users?page=x")
+    client.get("/users?page=x")
+    release.set()
+    failure_log.join()
+    stats = failure_log.stats()
+    assert stats["logged"] == 2
+    assert stats["dropped_queue"] == 1
+
+
+def test_sink_errors_are_counted():
+    failure_log = FailureLogger(BrokenSink())
+    client = create_app(failure_log).test_client()
+    assert client.get("/users?page=x").status_code == 400
+    failure_log.join()
+    assert failure_log.stats()["sink_errors"] == 1
+
+
+def test_json_lines_sink(tmp_path):
+    path = tmp_path / "failures.jsonl"
+    sink = JsonLinesSink(str(path))
+    sink.write([{"a": 1}, {"b": "中文"}])
+    sink.close()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [{"a": 1}, {"b": "中文"}]
+
+
+def test_sink_must_implement_write():
+    class Incomplete(Sink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,87 @@
+import json
+
+from flask import Flask
+from pydantic import BaseModel
+
+from flask_siwadoc import SiwaDoc, openapi
+
+
+class Query(BaseModel):
+    page: int = 1
+
+
+class User(BaseModel):
+    id: int
+    name: str
+
+
+def create_app(extra_route=False, **kwargs):
+    app = Flask(__name__)
+    siwa = SiwaDoc(app, **kwargs)
+
+    @app.get("/users")
+    @siwa.doc(query=Query, resp=User)
+    def users(query: Query):
+        return {"id": query.page, "name": "a"}
+
+    if extra_route:
+        @app.post("/users")
+        @siwa.doc(body=User)
+        def create_user(body: User):
+            return body.model_dump()
+
+    return app, siwa
+
+
+def test_fingerprint_is_stable():
+    _, siwa = create_app()
+    _, other = create_app()
+    assert siwa.fingerprint == other.fingerprint
+    assert siwa.fingerprinted_openapi_url == f"/openapi.{siwa.fingerprint}.json"
+
+
+def test_fingerprint_changes_with_routes_and_options():
+    _, siwa = create_app()
+    _, extra = create_app(extra_route=True)
+    _, titled = create_app(title="other")
+    assert len({siwa.fingerprint, extra.fingerprint, titled.fingerprint}) == 3
+
+
+def test_fingerprinted_url_is_immutable():
+    app, siwa = create_app()
+    client = app.test_client()
+    url = siwa.fingerprinted_openapi_url
+    r = client.get(url)
+    assert r.status_code == 200
+    assert r.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert r.headers["ETag"] == f'"{siwa.fingerprint}"'
+    assert r.json == client.get("/openapi.json").json
+    assert client.get(url, headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
+    assert client.get("/openapi.0000000000000000.json").status_code == 404
+
+
+def test_docs_page_uses_fingerprinted_url():
+    app, siwa = create_app()
+    assert siwa.fingerprinted_openapi_url.encode() in app.test_client().get("/docs").data
+
+
+def test_spec_is_written_and_reused_from_disk(tmp_path, monkeypatch):
+    _, siwa = create_app(spec_cache_dir=str(tmp_path))
+    data = siwa.openapi_json
+    cache_file = tmp_path / f"openapi.{siwa.fingerprint}.json"
+    assert cache_file.read_bytes() == data
+
+    def generate(**kwargs):
+        raise AssertionError("spec should be loaded from disk")
+
+    monkeypatch.setattr(openapi, "generate_openapi", generate)
+    _, other = create_app(spec_cache_dir=str(tmp_path))
+    assert other.openapi_json == data
+    assert json.loads(data)["paths"]["/users"]["get"]
+
+
+def test_spec_cache_dir_from_config(tmp_path):
+    app, siwa = create_app()
+    app.config["SIWA_SPEC_CACHE_DIR"] = str(tmp_path)
+    siwa.openapi_json
+    assert (tmp_path / f"openapi.{siwa.fingerprint}.json").exists()
@@ -0,0 +1,111 @@
+import io
+
+import pytest
+from flask import Flask, Request
+from pydantic import BaseModel
+from werkzeug.exceptions import BadRequest
+
+from flask_siwadoc import SiwaDoc
+from flask_siwadoc.utils import check_json_limits
+
+
+class Payload(BaseModel):
+    data: list = []
+
+
+class Upload(BaseModel):
+    text: str = ""
+
+
+CHUNKED = {"Transfer-Encoding": "chunked", "Content-Type": "application/json"}
+
+
+def create_app():
+    app = Flask(__name__)
+    siwa = SiwaDoc(app)
+
+    @app.post("/body")
+    @siwa.doc(body=Payload, max_body_bytes=32, max_json_depth=3, max_items=4)
+    def body(body: Payload):
+        return {"n": len(body.data)}
+
+    @app.post("/form")
+    @siwa.doc(form=Upload, max_body_bytes=32)
+    def form(form: Upload):
+        return {"n": len(form.text)}
+
+    return app
+
+
+def test_body_within_limits():
+    r = create_app().test_client().post("/body", json={"data": [1, 2]})
+    assert r.json == {"n": 2}
+
+
+def test_body_too_large():
+    r = create_app().test_client().post("/body", json={"data": ["x" * 40]})
+    assert r.status_code == 413
+
+
+def test_body_too_deep_or_too_many_items():
+    client = create_app().test_client()
+    assert client.post("/body", json={"data": [[[1]]]}).status_code == 400
+    assert client.post("/body", json={"data": [1, 2, 3, 4, 5]}).status_code == 400
+
+
+def test_chunked_body_too_large():
+    client = create_app().test_client()
+    r = client.post("/body", input_stream=io.BytesIO(b'{"data": ["' + b"x" * 40 + b'"]}'),
+                    headers=CHUNKED, environ_overrides={"wsgi.input_terminated": True})
+    assert r.status_code == 413
+    r = client.post("/body", input_stream=io.BytesIO(b'{"data": [1]}'),
+                    headers=CHUNKED, environ_overrides={"wsgi.input_terminated": True})
+    assert r.json == {"n": 1}
+
+
+def test_form_too_large():
+    client = create_app().test_client()
+    assert client.post("/form", data={"text": "x" * 10}).json == {"n": 10}
+    assert client.post("/form", data={"text": "x" * 40}).status_code == 413
+
+
+def test_limits_without_settable_max_content_length(monkeypatch):
+    # Flask 3.1 之前 request.max_content_length 是只读属性
+    monkeypatch.setattr(Request, "max_content_length", property(lambda self: None))
+    client = create_app().test_client()
+    assert client.post("/body", json={"data": [1]}).json == {"n": 1}
+    assert client.post("/body", json={"data": ["x" * 40]}).status_code == 413
+    r = client.post("/body", input_stream=io.BytesIO(b'{"data": ["' + b"x" * 40 + b'"]}'),
+                    headers=CHUNKED, environ_overrides={"wsgi.input_terminated": True})
+    assert r.status_code == 413
+    assert client.post("/form", data={"text": "x" * 40}).status_code == 413
+
+
+@pytest.mark.parametrize("data", [b"[]", b"[[]]", b'{"a": {"b": 1}}', b'"[[[["', b'{"a": "[{[{"}'])
+def test_json_depth_within_limit(data):
+    check_json_limits(data, max_depth=2)
+
+
+@pytest.mark.parametrize("data", [b"[[[]]]", b'{"a": {"b": {"c": 1}}}', b'[{"a": [1]}]'])
+def test_json_depth_exceeded(data):
+    with pytest.raises(BadRequest):
+        check_json_limits(data, max_depth=2)
+
+
+@pytest.mark.parametrize("data", [b"[1, 2, 3]", b'{"a": 1, "b": 2, "c": 3}', b'["a,b,c,d,e"]', b"[[1, 2, 3], [4, 5, 6]]"])
+def test_json_items_within_limit(data):
+    check_json_limits(data, max_items=3)
+
+
+@pytest.mark.parametrize("data", [b"[1, 2, 3, 4]", b'{"a": 1, "b": 2, "c": 3, "d": 4}', b"[[1], [[1, 2, 3, 4]]]"])
+def test_json_items_exceeded(data):
+    with pytest.raises(BadRequest):
+        check_json_limits(data, max_items=3)
+
+
+def test_json_escaped_quote_in_string():
+    check_json_limits(b'["a\\",[[[", 1]', max_depth=1, max_items=2)
+
+
+def test_json_no_limits():
+    check_json_limits(b"[[[[1, 2, 3, 4]]]]")
@@ -0,0 +1,94 @@
+import pytest
+from flask import Flask
+from pydantic import BaseModel, Field, ValidationError
+
+from flask_siwadoc import SiwaDoc
+
+
+class UserPath(BaseModel):
+    user_id: int = Field(ge=1, description="用户id")
+
+
+class MissingPath(BaseModel):
+    user_id: int
+    name: str
+
+
+def create_app():
+    app = Flask(__name__)
+    siwa = SiwaDoc(app, openapi_url="/openapi.json")
+
+    @app.errorhandler(ValidationError)
+    def validation_error(e):
+        return {"errors": e.errors(include_url=False, include_context=False)}, 400
+
+    return app, siwa
+
+
+def test_path_model_validates_and_injects():
+    app, siwa = create_app()
+
+    @app.get("/users/<int:user_id>")
+    @siwa.doc(path=UserPath)
+    def get_user(user_id, path: UserPath):
+        return {"user_id": path.user_id}
+
+    client = app.test_client()
+    assert client.get("/users/3").json == {"user_id": 3}
+    r = client.get("/users/0")
+    assert r.status_code == 400
+    assert r.json["errors"][0]["loc"] == ["user_id"]
+
+
+def test_path_model_is_documented():
+    app, siwa = create_app()
+
+    @app.get("/users/<int:user_id>")
+    @siwa.doc(path=UserPath)
+    def get_user(user_id):
+        return {"user_id": user_id}
+
+    param = siwa.openapi["paths"]["/users/{user_id}"]["get"]["parameters"][0]
+    assert param["name"] == "user_id"
+    assert param["schema"]["minimum"] == 1
+    assert param["description"] == "用户id"
+
+
+def test_path_url_variable_is_not_a_model():
+    app, siwa = create_app()
+
+    @app.get("/files/<path:path>")
+    @siwa.doc()
+    def files(path: str):
+        return {"path": path}
+
+    assert app.test_client().get("/files/a/b.txt").json == {"path": "a/b.txt"}
+
+
+def test_path_model_annotation_keeps_url_variable():
+    app, siwa = create_app()
+
+    class FilePath(BaseModel):
+        path: str
+
+    @app.get("/files/<path:path>")
+    @siwa.doc()
+    def files(path: FilePath):
+        return {"path": path}
+
+    assert app.test_client().get("/files/a/b.txt").json == {"path": "a/b.txt"}
+
+
+def test_path_model_requires_route_variables():
+    app, siwa = create_app()
+    app.testing = True
+
+    @app.get("/users/<int:user_id>")
+    @siwa.doc(path=MissingPath)
+    def get_user(user_id, path: MissingPath):
+        return {}
+
+    with pytest.raises(AssertionError, match="name"):
+        app.test_client().get("/users/1")
+    with pytest.raises(AssertionError, match="name"):
+        siwa.openapi
@@ -0,0 +1,119 @@
+from typing import List
+
+from flask import Flask
+from pydantic import BaseModel
+
+from flask_siwadoc import SiwaDoc
+from flask_siwadoc.registry import ModelRegistry, REF_TEMPLATE
+
+
+def user_models():
+    class Address(BaseModel):
+        street: str
+
+    class User(BaseModel):
+        addr: Address
+
+    return Address, User
+
+
+def shop_models():
+    class Address(BaseModel):
+        zip: str
+
+    class Shop(BaseModel):
+        addr: Address
+
+    return Address, Shop
+
+
+class Node(BaseModel):
+    value: int
+    children: List["Node"] = []
+
+
+def ref_name(schema):
+    return schema["$ref"][len(REF_TEMPLATE.format(model="")):]
+
+
+def test_nested_models_with_same_name_are_kept_apart():
+    registry = ModelRegistry()
+    _, user = user_models()
+    shop_address, shop = shop_models()
+    registry.register(user)
+    registry.register(shop)
+    user_addr = ref_name(registry["User"]["properties"]["addr"])
+    shop_addr = ref_name(registry["Shop"]["properties"]["addr"])
+    assert user_addr == "Address"
+    assert shop_addr != user_addr
+    assert set(registry.definitions[user_addr]["properties"]) == {"street"}
+    assert set(registry.definitions[shop_addr]["properties"]) == {"zip"}
+    assert shop_addr.endswith(shop_address.__qualname__.replace("<", "_").replace(">", "_"))
+
+
+def test_top_level_model_does_not_overwrite_nested_one():
+    registry = ModelRegistry()
+    user_address, user = user_models()
+    shop_address, _ = shop_models()
+    registry.register(user)
+    name = registry.register(shop_address)
+    assert name != "Address"
+    assert set(registry.definitions["Address"]["properties"]) == {"street"}
+    assert set(registry[name]["properties"]) == {"zip"}
+    # 同一个模型作为顶层模型注册时沿用嵌套时的组件名
+    assert registry.register(user_address) == "Address"
+
+
+def test_nested_model_clashing_with_top_level_model():
+    registry = ModelRegistry()
+    _, user = user_models()
+    shop_address, shop = shop_models()
+    assert registry.register(shop_address) == "Address"
+    registry.register(user)
+    user_addr = ref_name(registry["User"]["properties"]["addr"])
+    assert user_addr != "Address"
+    assert set(registry.definitions[user_addr]["properties"]) == {"street"}
+    assert set(registry["Address"]["properties"]) == {"zip"}
+
+
+def test_same_nested_model_is_shared():
+    registry = ModelRegistry()
+    address, user = user_models()
+
+    class Order(BaseModel):
+        addr: address
+
+    registry.register(user)
+    registry.register(Order)
+    assert ref_name(registry["Order"]["properties"]["addr"]) == "Address"
+    assert len(registry.definitions) == 1
+
+
+def test_self_referencing_model():
+    registry = ModelRegistry()
+    assert registry.register(Node) == "Node"
+    assert "$ref" not in registry["Node"]
+    assert ref_name(registry["Node"]["properties"]["children"]["items"]) == "Node"
+
+
+def test_openapi_components_do_not_collide():
+    app = Flask(__name__)
+    siwa = SiwaDoc(app, openapi_url="/openapi.json")
+    _, user = user_models()
+    _, shop = shop_models()
+
+    @app.post("/users")
+    @siwa.doc(body=user)
+    def create_user():
+        return {}
+
+    @app.post("/shops")
+    @siwa.doc(body=shop)
+    def create_shop():
+        return {}
+
+    schemas = siwa.openapi["components"]["schemas"]
+    user_addr = ref_name(schemas["User"]["properties"]["addr"])
+    shop_addr = ref_name(schemas["Shop"]["properties"]["addr"])
+    assert "street" in schemas[user_addr]["properties"]
+    assert "zip" in schemas[shop_addr]["properties"]
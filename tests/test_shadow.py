@@ -0,0 +1,78 @@
+import threading
+
+from flask import Flask, request
+from pydantic import BaseModel
+
+from flask_siwadoc import SiwaDoc
+from flask_siwadoc.shadow import ShadowValidator
+
+
+class Order(BaseModel):
+    id: int
+    qty: int = 1
+
+
+class Query(BaseModel):
+    page: int = 1
+
+
+def create_app():
+    app = Flask(__name__)
+    siwa = SiwaDoc(app)
+
+    @app.post("/orders")
+    @siwa.doc(body=Order, query=Query, mode="shadow")
+    def create_order(**kwargs):
+        return {"kwargs": sorted(kwargs), "data": request.get_json(silent=True)}
+
+    return app, siwa
+
+
+def test_view_runs_without_injection():
+    app, siwa = create_app()
+    r = app.test_client().post("/orders?page=x", json={"id": "not a number"})
+    assert r.status_code == 200
+    assert r.json == {"kwargs": [], "data": {"id": "not a number"}}
+    siwa.shadow.join()
+
+
+def test_mismatches_are_counted():
+    app, siwa = create_app()
+    client = app.test_client()
+    client.post("/orders", json={"id": 1})
+    client.post("/orders", json={"id": "x"})
+    client.post("/orders?page=x", json={"id": 1})
+    client.post("/orders")
+    siwa.shadow.join()
+    stats = siwa.shadow.stats()
+    assert stats["submitted"] == stats["validated"] == 4
+    assert stats["dropped"] == 0
+    assert stats["mismatches"] == 3
+    assert stats["endpoints"] == {"create_order": 3}
+
+
+def test_docs_mark_shadow_mode():
+    _, siwa = create_app()
+    operation = siwa.openapi["paths"]["/orders"]["post"]
+    assert operation["x-validation-mode"] == "shadow"
+    assert "400" not in operation["responses"]
+
+
+def test_full_queue_drops_tasks():
+    validator = ShadowValidator(workers=1, maxsize=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+
+    assert validator.submit("a", blocking)
+    assert started.wait(5)
+    assert validator.submit("a", lambda: None)
+    assert not validator.submit("a", lambda: None)
+    release.set()
+    validator.join()
+    stats = validator.stats()
+    assert stats["submitted"] == 2
+    assert stats["dropped"] == 1
+    assert stats["validated"] == 2
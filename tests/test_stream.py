@@ -0,0 +1,106 @@
+import json
+from typing import List, Optional, Set
+
+from flask import Flask
+from pydantic import BaseModel
+
+from flask_siwadoc import SiwaDoc, encoding
+
+
+class Item(BaseModel):
+    id: int
+
+
+def create_app():
+    app = Flask(__name__)
+    siwa = SiwaDoc(app, openapi_url="/openapi.json")
+    return app, siwa
+
+
+def test_generator_streams_json_array():
+    app, siwa = create_app()
+
+    @app.get("/items")
+    @siwa.doc(resp=List[Item])
+    def items():
+        return (Item(id=i) for i in range(3))
+
+    r = app.test_client().get("/items")
+    assert r.is_streamed
+    assert r.mimetype == "application/json"
+    assert r.json == [{"id": 0}, {"id": 1}, {"id": 2}]
+
+
+def test_generator_streams_ndjson():
+    app, siwa = create_app()
+
+    @app.get("/items")
+    @siwa.doc(resp=List[Item])
+    def items():
+        return (Item(id=i) for i in range(3))
+
+    r = app.test_client().get("/items", headers={"Accept": "application/x-ndjson"})
+    assert r.mimetype == "application/x-ndjson"
+    assert [json.loads(line) for line in r.get_data(as_text=True).splitlines()] == [{"id": 0}, {"id": 1}, {"id": 2}]
+
+
+def test_empty_generator():
+    app, siwa = create_app()
+
+    @app.get("/items")
+    @siwa.doc(resp=List[Item])
+    def items():
+        return iter(())
+
+    client = app.test_client()
+    assert client.get("/items").json == []
+    assert client.get("/items", headers={"Accept": "application/x-ndjson"}).data == b""
+
+
+def test_stream_is_chunked(monkeypatch):
+    monkeypatch.setattr(encoding, "STREAM_CHUNK_SIZE", 16)
+    app, siwa = create_app()
+
+    @app.get("/items")
+    @siwa.doc(resp=List[Item])
+    def items():
+        return (Item(id=i) for i in range(10))
+
+    r = app.test_client().get("/items", buffered=False)
+    chunks = list(r.response)
+    r.close()
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks)) == [{"id": i} for i in range(10)]
+
+
+def test_list_response_documented_as_array():
+    app, siwa = create_app()
+
+    @app.get("/items")
+    @siwa.doc(resp=List[Item])
+    def items():
+        return []
+
+    content = siwa.openapi["paths"]["/items"]["get"]["responses"]["200"]["content"]
+    assert content["application/json"]["schema"] == {"type": "array", "items": {"$ref": "#/components/schemas/Item"}}
+    assert "application/x-ndjson" in content
+
+
+def test_only_plain_list_streams():
+    app, siwa = create_app()
+
+    @app.get("/optional")
+    @siwa.doc(resp=Optional[List[Item]])
+    def optional_items():
+        return []
+
+    @app.get("/set")
+    @siwa.doc(resp=Set[int])
+    def int_set():
+        return []
+
+    assert not getattr(optional_items, "resp_many", False)
+    assert not getattr(int_set, "resp_many", False)
+    paths = siwa.openapi["paths"]
+    for path in ("/optional", "/set"):
+        assert "application/x-ndjson" not in paths[path]["get"]["responses"]["200"]["content"]
@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+from typing import Dict, List
+
+import pytest
+from flask import Flask
+from pydantic import BaseModel, ValidationError
+from typing_extensions import TypedDict
+
+from flask_siwadoc import SiwaDoc
+
+
+class Item(BaseModel):
+    id: int
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+class Filters(TypedDict):
+    page: int
+    tags: List[str]
+
+
+def create_app():
+    app = Flask(__name__)
+    siwa = SiwaDoc(app, openapi_url="/openapi.json")
+
+    @app.errorhandler(ValidationError)
+    def validation_error(e):
+        return {"errors": e.errors(include_url=False, include_context=False)}, 400
+
+    return app, siwa
+
+
+def test_list_body():
+    app, siwa = create_app()
+
+    @app.post("/items")
+    @siwa.doc(body=List[Item])
+    def create_items(body: List[Item]):
+        return {"ids": [item.id for item in body]}
+
+    client = app.test_client()
+    assert client.post("/items", json=[{"id": 1}, {"id": 2}]).json == {"ids": [1, 2]}
+    assert client.post("/items", json=[{"id": "x"}]).status_code == 400
+    schema = siwa.openapi["paths"]["/items"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    component = siwa.openapi["components"]["schemas"][schema["$ref"].rsplit("/", 1)[1]]
+    assert component["type"] == "array"
+
+
+def test_dataclass_response_and_typed_dict_query():
+    app, siwa = create_app()
+
+    @app.get("/point")
+    @siwa.doc(query=Filters, resp=Point)
+    def point(query: Filters):
+        return {"x": query["page"], "y": len(query["tags"])}
+
+    r = app.test_client().get("/point?page=2&tags=a&tags=b")
+    assert r.json == {"x": 2, "y": 2}
+    params = {p["name"] for p in siwa.openapi["paths"]["/point"]["get"]["parameters"]}
+    assert params == {"page", "tags"}
+
+
+def test_mapping_query_is_documented_as_object():
+    app, siwa = create_app()
+
+    @app.get("/counts")
+    @siwa.doc(query=Dict[str, int])
+    def counts(query: Dict[str, int]):
+        return query
+
+    assert app.test_client().get("/counts?a=1&b=2").json == {"a": 1, "b": 2}
+    param, = siwa.openapi["paths"]["/counts"]["get"]["parameters"]
+    assert param["in"] == "query"
+    assert param["style"] == "form" and param["explode"] is True
+    assert param["schema"]["additionalProperties"] == {"type": "integer"}
+
+
+def test_query_without_fields_is_rejected():
+    app, siwa = create_app()
+    with pytest.raises(AssertionError):
+        @siwa.doc(query=List[int])
+        def ids(query: List[int]):
+            return query
+
+
+def test_warmup_with_non_model_types():
+    app, siwa = create_app()
+
+    @app.post("/items")
+    @siwa.doc(body=List[Item], resp=Point)
+    def create_items(body: List[Item]):
+        return {"x": 0, "y": 0}
+
+    siwa.warmup()
+    assert siwa._openapi_json is not None
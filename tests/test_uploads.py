@@ -0,0 +1,135 @@
+import hashlib
+import io
+import struct
+import threading
+
+import pytest
+from flask import Flask
+from pydantic import BaseModel, ValidationError
+from werkzeug.datastructures import FileStorage
+
+from flask_siwadoc import SiwaDoc
+from flask_siwadoc.uploads import image_size, max_image_size, sniff_type
+
+PNG = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480) + b"\x00" * 100
+GIF = b"GIF89a" + struct.pack("<HH", 32, 16) + b"\x00" * 20
+
+
+def create_app(files, **kwargs):
+    app = Flask(__name__)
+    siwa = SiwaDoc(app, **kwargs)
+
+    @app.errorhandler(ValidationError)
+    def validation_error(e):
+        return {"errors": e.errors(include_url=False, include_context=False)}, 400
+
+    @app.post("/upload")
+    @siwa.doc(form=BaseModel, files=files)
+    def upload(files: dict):
+        result = {}
+        for field, value in files.items():
+            items = value if isinstance(value, list) else [value]
+            result[field] = [{k: list(v) if isinstance(v, tuple) else v for k, v in f.checks.items()}
+                             if hasattr(f, "checks") else None for f in items]
+        return result
+
+    return app
+
+
+def post(app, **files):
+    data = {field: [(io.BytesIO(content), f"{field}{i}") for i, content in enumerate(contents)]
+            for field, contents in files.items()}
+    return app.test_client().post("/upload", data=data, content_type="multipart/form-data")
+
+
+def test_checksum_and_sniff_type():
+    app = create_app({"photo": {"checksum": True, "sniff_type": True},
+                      "doc": {"checksum": "md5"}})
+    r = post(app, photo=[PNG], doc=[b"hello"])
+    assert r.status_code == 200
+    assert r.json["photo"] == [{"checksum": hashlib.sha256(PNG).hexdigest(), "content_type": "image/png"}]
+    assert r.json["doc"] == [{"checksum": hashlib.md5(b"hello").hexdigest()}]
+
+
+def test_file_pointer_is_reset():
+    def read_all(file):
+        return len(file.read())
+
+    app = create_app({"photo": {"checksum": True, "checks": [read_all, read_all]}})
+    r = post(app, photo=[PNG])
+    assert r.json["photo"][0]["read_all"] == len(PNG)
+
+
+def test_image_size_check():
+    app = create_app({"photos": {"single": False, "checks": [max_image_size(100, 100)]}})
+    r = post(app, photos=[GIF])
+    assert r.json["photos"] == [{"image_size": [32, 16]}]
+    r = post(app, photos=[GIF, PNG])
+    assert r.status_code == 400
+    error, = r.json["errors"]
+    assert error["loc"] == ["photos"]
+    assert error["type"] == "value_error"
+    assert "640x480" in error["msg"]
+
+
+def test_custom_check_error():
+    def not_empty(file):
+        if not file.read(1):
+            raise ValueError("empty file")
+        return True
+
+    app = create_app({"doc": {"checks": [not_empty]}})
+    assert post(app, doc=[b"x"]).json == {"doc": [{"not_empty": True}]}
+    r = post(app, doc=[b""])
+    assert r.status_code == 400
+    assert "empty file" in r.json["errors"][0]["msg"]
+
+
+def test_missing_and_too_many_files():
+    app = create_app({"a": {"required": True}, "b": {"single": True}})
+    r = post(app, b=[b"1", b"2"])
+    assert r.status_code == 400
+    assert [(e["loc"], e["type"]) for e in r.json["errors"]] == [(["a"], "missing"), (["b"], "too_long")]
+
+
+def test_files_are_checked_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def wait_for_others(file):
+        barrier.wait()
+        return threading.current_thread().name
+
+    app = create_app({"docs": {"single": False, "checks": [wait_for_others]}}, files_workers=3)
+    r = post(app, docs=[b"1", b"2", b"3"])
+    assert r.status_code == 200
+    names = [item["wait_for_others"] for item in r.json["docs"]]
+    assert len(set(names)) == 3
+    assert all(name.startswith("siwadoc-files") for name in names)
+
+
+@pytest.mark.parametrize("files", [
+    {"doc": {"checksum": "sha-not-exists"}},
+    {"doc": {"checksum": 1}},
+    {"doc": {"checks": ["not callable"]}},
+])
+def test_invalid_conf_is_rejected_at_decoration(files):
+    with pytest.raises(ValueError):
+        create_app(files)
+
+
+@pytest.mark.parametrize("head,content_type", [
+    (PNG, "image/png"),
+    (GIF, "image/gif"),
+    (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "image/webp"),
+    (b"%PDF-1.7", "application/pdf"),
+    (b"\x00\x00\x00\x18ftypmp42", "video/mp4"),
+    (b"plain text", None),
+])
+def test_sniff_type(head, content_type):
+    assert sniff_type(head) == content_type
+
+
+def test_image_size_rejects_non_images():
+    with pytest.raises(ValueError):
+        image_size(FileStorage(io.BytesIO(b"plain text")))
+    assert image_size(FileStorage(io.BytesIO(PNG))) == (640, 480)
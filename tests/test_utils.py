@@ -0,0 +1,100 @@
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel, Field
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import BadRequest
+
+from flask_siwadoc.utils import convert_form_params
+
+
+class Item(BaseModel):
+    name: str
+    qty: int = 1
+    labels: List[str] = []
+
+
+class Address(BaseModel):
+    city: str
+
+
+class Node(BaseModel):
+    value: int
+    children: List["Node"] = []
+
+
+class OrderForm(BaseModel):
+    title: str = ""
+    tags: List[str] = []
+    items: List[Item] = []
+    address: Optional[Address] = None
+    ids: List[int] = Field(default=[], alias="id")
+    tree: Optional[Node] = None
+
+
+def convert(pairs):
+    return convert_form_params(MultiDict(pairs), OrderForm)
+
+
+def test_scalar_field_takes_first_value():
+    assert convert([("title", "a"), ("title", "b")]) == {"title": "a"}
+
+
+def test_list_field_takes_all_values():
+    assert convert([("tags", "a"), ("tags", "b")]) == {"tags": ["a", "b"]}
+
+
+def test_list_field_by_alias():
+    assert convert([("id", "1"), ("id", "2")]) == {"id": ["1", "2"]}
+
+
+def test_unknown_field_is_kept():
+    assert convert([("extra", "x"), ("extra", "y")]) == {"extra": "x"}
+
+
+def test_bracket_and_dot_path():
+    data = convert([("items[0].name", "apple"), ("items[0].qty", "2"), ("address.city", "shanghai")])
+    assert data == {"items": [{"name": "apple", "qty": "2"}], "address": {"city": "shanghai"}}
+
+
+def test_nested_list_field_takes_all_values():
+    data = convert([("items[0].name", "apple"), ("items[0].labels", "a"), ("items[0].labels", "b")])
+    assert data == {"items": [{"name": "apple", "labels": ["a", "b"]}]}
+
+
+def test_empty_brackets_append():
+    assert convert([("tags[]", "a"), ("tags[]", "b")]) == {"tags": ["a", "b"]}
+
+
+def test_sparse_indices_are_ordered():
+    data = convert([("items[10].name", "c"), ("items[2].name", "b"), ("items[0].name", "a")])
+    assert data == {"items": [{"name": "a"}, {"name": "b"}, {"name": "c"}]}
+
+
+def test_recursive_model():
+    data = convert([("tree.value", "1"), ("tree.children[0].value", "2"), ("tree.children[0].children[0].value", "3")])
+    assert OrderForm(**data).tree.children[0].children[0].value == 3
+
+
+@pytest.mark.parametrize("key", ["a..b", ".a", "[0]", "a[x]", "a["])
+def test_malformed_key_is_kept_verbatim(key):
+    assert convert_form_params(MultiDict([(key, "v")]), OrderForm) == {key: "v"}
+
+
+@pytest.mark.parametrize("pairs", [
+    [("items[0]", "x"), ("items[0].name", "y")],
+    [("address", "x"), ("address.city", "y")],
+    [("tags", "x"), ("tags[0]", "y")],
+    [("items.name", "x"), ("items[0].name", "y")],
+])
+def test_conflicting_keys(pairs):
+    with pytest.raises(BadRequest):
+        convert(pairs)
+
+
+def test_converted_form_validates():
+    form = OrderForm(**convert([("tags", "a"), ("items[0].name", "apple"), ("items[0].qty", "2"),
+                                ("address.city", "shanghai"), ("id", "1"), ("id", "2")]))
+    assert form.items[0].qty == 2
+    assert form.ids == [1, 2]
+    assert form.address.city == "shanghai"